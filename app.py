@@ -1,9 +1,20 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import re # Import regex for search
 from datetime import datetime # For date filtering
 import random # For study blocks
+import os
+import functools
+from data_store import load_snapshot, snapshot_token # On-disk Arrow snapshot of the processed Excel
+from filter_engine import FilterEngine # Posting lists for the sidebar filters
+import search_index # Inverted index for the keyword search
+import related # Precomputed related julgados (top-k TF-IDF neighbours)
+from result_cache import ResultCache, canonical_key # Process-wide cache of filter/search results
+from stats_cube import StatsCube # Pre-aggregated counts for the Estatísticas tab
+import user_store # Per-user favorites, metas and reading progress (SQLite)
+from content_store import ContentStore, content_hash # Assertivas/casos práticos written offline by generate_content.py
+import perf # Timing spans per rerun + process-wide p50/p95/p99
+import export # Chunked CSV/XLSX/Parquet export of the selection, cached on disk
 
 # Configuração inicial da página
 st.set_page_config(
@@ -24,129 +35,36 @@ if 'selected_julgado_id_caso' not in st.session_state:
     st.session_state.selected_julgado_id_caso = None
 if 'show_caso_pratico_dialog' not in st.session_state:
     st.session_state.show_caso_pratico_dialog = False
-if 'favorites' not in st.session_state:
-    st.session_state.favorites = set()
+if 'user_id' not in st.session_state: # Favorites/metas follow ?u=<uuid>, so reloading or bookmarking the page keeps them
+    st.session_state.user_id = user_store.parse_user_id(st.query_params.get('u')) or user_store.new_user_id()
+st.query_params['u'] = st.session_state.user_id
 if 'selected_meta_julgado_id' not in st.session_state: # For clickable study blocks
     st.session_state.selected_meta_julgado_id = None
-if 'current_study_meta_ids' not in st.session_state: # Store current meta list
-    st.session_state.current_study_meta_ids = []
-
-# --- Mapeamento Simulado (Ramo -> Área de Estudo) --- 
-RAMO_TO_AREA_MAP = {
-    'Direito Constitucional': 'Direito Público',
-    'Direito Administrativo': 'Direito Público',
-    'Direito Tributário': 'Direito Público',
-    'Direito Financeiro': 'Direito Público',
-    'Direito Eleitoral': 'Direito Público',
-    'Direito Ambiental': 'Direito Público',
-    'Direito Urbanístico': 'Direito Público',
-    'Direito Penal': 'Direito Penal',
-    'Direito Processual Penal': 'Direito Penal',
-    'Direito Civil': 'Direito Privado',
-    'Direito Empresarial': 'Direito Privado',
-    'Direito Comercial': 'Direito Privado',
-    'Direito do Consumidor': 'Direito Privado',
-    'Direito Processual Civil': 'Direito Processual',
-    'Direito do Trabalho': 'Direito Social / Trabalho',
-    'Direito Processual do Trabalho': 'Direito Social / Trabalho',
-    'Direito Previdenciário': 'Direito Social / Previdenciário',
-    'Direito Internacional Público': 'Direito Internacional',
-    'Direito Internacional Privado': 'Direito Internacional',
-}
-DEFAULT_AREA = 'Outras Áreas'
-
-# --- Carregamento e Preparação dos Dados (Atualizado V4 - Excel, Notícia Completa Fix) ---
-@st.cache_data
-def load_data(excel_path):
+if 'current_study_meta_ids' not in st.session_state: # Store current meta list (None = restore the last one from the user store)
+    st.session_state.current_study_meta_ids = None
+if 'page_cursor' not in st.session_state: # Pagination of the Informativos results
+    st.session_state.page_cursor = 0
+if 'page_signature' not in st.session_state:
+    st.session_state.page_signature = None
+if 'pending_toasts' not in st.session_state: # Messages queued by callbacks (see notify)
+    st.session_state.pending_toasts = []
+if 'meta_quantidade' not in st.session_state:
+    st.session_state.meta_quantidade = 5
+# Only the active tab is rendered, and Streamlit drops the state of widgets that were not rendered in a run;
+# re-assigning their keys keeps the search, view mode and page size across tab switches
+for widget_key in ('busca', 'modo_visualizacao', 'page_size', 'formato_exportacao', 'meta_quantidade'):
+    if widget_key in st.session_state:
+        st.session_state[widget_key] = st.session_state[widget_key]
+
+# --- Carregamento e Preparação dos Dados (Atualizado V6 - Julgados únicos + vínculos ramo/área) ---
+@st.cache_resource(max_entries=2)
+def load_data(excel_path, token=None):
+    # token (Excel + manifest mtimes) only keys the in-process cache; the on-disk snapshot is validated by mtime + sha256
+    # A batch ingested by ingest.py changes the manifest, so running processes switch to the new version on their next rerun
+    # cache_resource shares one read-only Dataset across sessions instead of a copy per rerun
     try:
-        # Read from the new Excel file
-        df = pd.read_excel(excel_path)
-        print(f"Colunas lidas do Excel: {df.columns.tolist()}")
-
-        # Rename columns based on the new Excel structure
-        rename_map = {
-            'Numero do informativo': 'numero_informativo',
-            'Classe Processo': 'classe_processo',
-            'Data Julgamento': 'data_julgamento', # Assuming this column exists
-            'Tese Julgado': 'tese_julgamento', # This seems to be the 'Notícia Completa'
-            'Ramo Direito': 'ramo_direito',
-            'Repercussão Geral': 'repercussao_geral',
-            'Título': 'Título', # Keep original 'Título'
-            'Resumo': 'Resumo', # Keep original 'Resumo'
-            'Legislação': 'Legislação' # Keep original 'Legislação'
-            # Add other columns if needed
-        }
-        # Select only columns that exist in the Excel file before renaming
-        existing_cols_map = {k: v for k, v in rename_map.items() if k in df.columns}
-        df.rename(columns=existing_cols_map, inplace=True)
-        print(f"Colunas após renomear: {df.columns.tolist()}")
-
-        # Ensure essential columns exist, fill with default if not
-        essential_cols = ['Título', 'tese_julgamento', 'ramo_direito', 'classe_processo', 'Resumo', 'Legislação', 'numero_informativo', 'repercussao_geral']
-        for col in essential_cols:
-            if col not in df.columns:
-                df[col] = ''
-                print(f"Aviso: Coluna '{col}' não encontrada no Excel, criada vazia.")
-
-        # Process 'Data Julgamento'
-        if 'data_julgamento' in df.columns:
-            df['data_julgamento'] = pd.to_datetime(df['data_julgamento'], errors='coerce') # Let pandas infer format or specify if needed
-            df['ano_julgamento'] = df['data_julgamento'].dt.year
-            df['mes_julgamento'] = df['data_julgamento'].dt.month
-            df['ano_mes_julgamento'] = df['data_julgamento'].dt.strftime('%Y-%m')
-        else:
-            # If no date column, create placeholders
-            print("Aviso: Coluna 'data_julgamento' não encontrada. Datas não serão processadas.")
-            df['data_julgamento'] = pd.NaT
-            df['ano_julgamento'] = None
-            df['mes_julgamento'] = None
-            df['ano_mes_julgamento'] = None
-
-        # Fill NaNs in text columns
-        text_cols = ['Título', 'tese_julgamento', 'ramo_direito', 'classe_processo', 'Resumo', 'Legislação']
-        for col in text_cols:
-            if col in df.columns:
-                df[col] = df[col].fillna('')
-
-        # Process 'numero_informativo'
-        if 'numero_informativo' in df.columns:
-             df['numero_informativo'] = pd.to_numeric(df['numero_informativo'], errors='coerce')
-             # Keep rows even if numero_informativo is NaN for now, maybe filter later
-             # df.dropna(subset=['numero_informativo'], inplace=True)
-             df['numero_informativo'] = df['numero_informativo'].astype('Int64').astype(str).replace('<NA>', '') # Handle potential NaNs after conversion
-
-        # Process 'repercussao_geral'
-        if 'repercussao_geral' in df.columns:
-            df['repercussao_geral'] = df['repercussao_geral'].fillna('Não Informado')
-            df['repercussao_geral'] = df['repercussao_geral'].replace({'Sim': 'Sim', 'Não': 'Não'}, regex=False)
-            df.loc[~df['repercussao_geral'].isin(['Sim', 'Não']), 'repercussao_geral'] = 'Não Informado'
-        else:
-            df['repercussao_geral'] = 'Não Informado'
-
-        # Add unique ID
-        if 'id' not in df.columns:
-            df['id'] = range(len(df))
-        df['id'] = df['id'].astype(str)
-
-        # Process 'Ramo Direito' (Split and Explode)
-        if 'ramo_direito' in df.columns:
-            df['ramo_direito'] = df['ramo_direito'].astype(str).str.split(';').apply(lambda x: [item.strip() for item in x if item.strip()])
-            df_exploded = df.explode('ramo_direito')
-        else:
-            df['ramo_direito'] = ''
-            df_exploded = df
-            
-        # Map 'Ramo Direito' to 'Área de Estudo'
-        if 'ramo_direito' in df_exploded.columns:
-            df_exploded['area_estudo'] = df_exploded['ramo_direito'].map(RAMO_TO_AREA_MAP).fillna(DEFAULT_AREA)
-        else:
-            df_exploded['area_estudo'] = DEFAULT_AREA
-
-        print(f"Colunas finais: {df_exploded.columns.tolist()}")
-        print(f"Número de linhas final: {len(df_exploded)}")
-        
-        return df_exploded
-
+        dataset, manifest = load_snapshot(excel_path)
+        return dataset
     except FileNotFoundError:
         st.error(f"Erro: Arquivo Excel não encontrado em {excel_path}")
         return None
@@ -154,36 +72,161 @@ def load_data(excel_path):
         st.error(f"Erro ao carregar ou processar os dados do Excel: {e}")
         return None
 
+@st.cache_resource(max_entries=2)
+def build_filter_engine(version, _dataset):
+    # Built once per data version and shared by every session
+    return FilterEngine(_dataset)
+
+@st.cache_resource(max_entries=2)
+def build_search_index(version, _dataset):
+    # Normally prebuilt by ingest.py; built here only if the file for this version is missing
+    return search_index.load_or_build(_dataset.julgados, version, _dataset.paths['search'])
+
+@st.cache_resource(max_entries=2)
+def build_stats_cube(version, _engine):
+    # Count cube over the filter engine's codes; never touches the text columns
+    return StatsCube(_engine)
+
+@st.cache_resource(max_entries=4)
+def load_related_index(version, path, available):
+    # Neighbour lists are built offline by ingest.py; `available` keys the cache so the file is picked up once it appears
+    return related.load_saved(version, path) if available else None
+
+def related_index():
+    path = dataset.paths['related']
+    return load_related_index(dataset.version, path, os.path.exists(path))
+
+def build_selections(date_filter_type, anos, meses_anos, areas, ramos, classes, informativo, rg):
+    return {
+        'ano_julgamento': list(anos) if date_filter_type == "Ano" else [],
+        'ano_mes_julgamento': list(meses_anos) if date_filter_type == "Mês/Ano" else [],
+        'area_estudo': list(areas),
+        'ramo_direito': list(ramos),
+        'classe_processo': list(classes),
+        'numero_informativo': [] if informativo == "Todos" else [informativo],
+        'repercussao_geral': [] if rg == "Todos" else [rg],
+    }
+
+@st.cache_resource
+def get_user_store():
+    # One SQLite connection + write batcher per process
+    return user_store.UserStore()
+
+def current_user():
+    return get_user_store().user(st.session_state.user_id)
+
+def favorite_rows(dataset):
+    # Cached per user until the favorites change; intersected with the filter engine's rows
+    return get_user_store().favorite_rows(st.session_state.user_id, dataset)
+
+@st.cache_resource
+def get_content_store():
+    # Read-only here; generate_content.py fills it offline
+    return ContentStore()
+
+def generated_content(record):
+    # -> (content or None, stale); stale = the julgado changed after the content was generated
+    content = get_content_store().get(record['id'])
+    return content, content is not None and content['content_hash'] != content_hash(record, record['ramos'])
+
+@st.cache_resource
+def get_result_cache():
+    # One LRU/TTL cache per process, shared by every session
+    return ResultCache()
+
+@st.cache_resource
+def get_metrics():
+    # Timing histograms for the whole process (admin panel / INFORMATIVOS_METRICS_FILE)
+    return perf.Metrics()
+
+def is_admin():
+    # Admin-only panels: open the app with ?admin=<INFORMATIVOS_ADMIN_TOKEN>
+    token = os.environ.get('INFORMATIVOS_ADMIN_TOKEN')
+    return bool(token) and st.query_params.get('admin') == token
+
+def sidebar_results(selections, favorites_only):
+    # Row codes, per-option counts and link count for a sidebar selection
+    def compute(restrict=None):
+        rows = filter_engine.select(selections, restrict)
+        return {
+            'rows': rows,
+            'facet_counts': filter_engine.facet_counts(selections, restrict),
+            'link_count': filter_engine.count_links(rows, selections),
+        }
+    if favorites_only: # Per-user, so never shared through the cache
+        return compute(favorite_rows(dataset))
+    return result_cache.get_or_compute(('filtros', canonical_key(selections)), dataset.version, compute)
+
+def search_results(selections, favorites_only, search_query, filtered_rows):
+    def compute():
+        return build_search_index(dataset.version, dataset).search(search_query, filtered_rows)[0]
+    if favorites_only:
+        return compute()
+    return result_cache.get_or_compute(('busca', canonical_key(selections, search_query)), dataset.version, compute)
+
+def stats_charts(selections, favorites_only, filtered_rows):
+    # Vega-Lite specs for the Estatísticas tab, cached per selection like the filter results
+    def compute():
+        cube = build_stats_cube(dataset.version, filter_engine)
+        rows = filtered_rows if favorites_only or not cube.covers(selections) else None
+        return stat_chart_specs(cube.summary(selections, rows))
+    if favorites_only:
+        return compute()
+    return result_cache.get_or_compute(('graficos', canonical_key(selections)), dataset.version, compute)
+
 # --- Funções de Callback --- 
+def notify(message):
+    # Shown as a toast by the view that reruns next; creating elements inside a fragment's callback is unsupported
+    st.session_state.pending_toasts.append(message)
+
 def select_julgado_for_assertiva(julgado_id):
     st.session_state.selected_julgado_id_assertiva = julgado_id
     st.session_state.selected_julgado_id_caso = None
     st.session_state.show_caso_pratico_dialog = False
-    st.toast(f"Julgado ID {julgado_id} selecionado. Verifique a aba 'Assertivas'.")
+    notify(f"Julgado ID {julgado_id} selecionado. Verifique a aba 'Assertivas'.")
 
 def select_julgado_for_caso(julgado_id):
     st.session_state.selected_julgado_id_caso = julgado_id
     st.session_state.selected_julgado_id_assertiva = None
     st.session_state.show_caso_pratico_dialog = True
-    st.toast(f"Julgado ID {julgado_id} selecionado para 'Caso Prático'. Veja abaixo.")
+    notify(f"Julgado ID {julgado_id} selecionado para 'Caso Prático'. Veja abaixo.")
+
+def close_caso_pratico():
+    # Callback instead of st.rerun(): the fragment rerun that follows already hides the dialog
+    st.session_state.show_caso_pratico_dialog = False
+    st.session_state.selected_julgado_id_caso = None
 
 def toggle_favorite(julgado_id):
-    if julgado_id in st.session_state.favorites:
-        st.session_state.favorites.remove(julgado_id)
-        st.toast(f"Julgado ID {julgado_id} removido dos favoritos.")
+    if get_user_store().toggle_favorite(st.session_state.user_id, julgado_id):
+        notify(f"Julgado ID {julgado_id} adicionado aos favoritos.")
     else:
-        st.session_state.favorites.add(julgado_id)
-        st.toast(f"Julgado ID {julgado_id} adicionado aos favoritos.")
+        notify(f"Julgado ID {julgado_id} removido dos favoritos.")
+    # Cards live in fragments; with "Mostrar Apenas Favoritos" on, the sidebar and results must refresh too
+    if st.session_state.get('filtro_favoritos'):
+        st.session_state.full_rerun_pending = True
 
 def select_meta_julgado(julgado_id):
     st.session_state.selected_meta_julgado_id = julgado_id
-    st.toast(f"Exibindo detalhes do julgado ID {julgado_id} da meta.")
+    notify(f"Exibindo detalhes do julgado ID {julgado_id} da meta.")
+
+def toggle_read(julgado_id):
+    get_user_store().set_read(st.session_state.user_id, julgado_id, julgado_id not in current_user().read)
+
+def resume_meta(julgado_ids):
+    st.session_state.current_study_meta_ids = list(julgado_ids)
+    st.session_state.selected_meta_julgado_id = None
+
+def start_meta(julgado_ids):
+    # New meta: shown now and kept in the user's meta history
+    resume_meta(julgado_ids)
+    if julgado_ids:
+        get_user_store().add_meta(st.session_state.user_id, julgado_ids)
 
 # --- Componentes de Visualização (Atualizado V4 - Notícia Completa Fix) ---
 def render_card(row, context="informativos"):
     date_str = row['data_julgamento'].strftime('%d/%m/%Y') if pd.notna(row['data_julgamento']) else 'Data Indisponível'
     card_title = f"**{row['Título']}** (Inf. {row['numero_informativo']} - {date_str})"
-    is_favorite = row['id'] in st.session_state.favorites
+    is_favorite = row['id'] in current_user().favorites
     favorite_icon = "⭐" if is_favorite else "☆"
     
     # Use a different key prefix based on context to avoid conflicts
@@ -195,10 +238,8 @@ def render_card(row, context="informativos"):
     with st.expander(card_title, expanded=expanded_default):
         st.button(f"{favorite_icon} Favorito", key=f"fav_{key_prefix}", on_click=toggle_favorite, args=(row['id'],), help="Adicionar/Remover dos Favoritos")
         st.markdown(f"**Classe:** {row['classe_processo']}")
-        all_ramos = df_informativos_exploded[df_informativos_exploded['id'] == row['id']]['ramo_direito'].unique()
-        all_areas = df_informativos_exploded[df_informativos_exploded['id'] == row['id']]['area_estudo'].unique()
-        st.markdown(f"**Ramo(s) do Direito:** {', '.join(all_ramos)}")
-        st.markdown(f"**Área(s) de Estudo:** {', '.join(all_areas)}")
+        st.markdown(f"**Ramo(s) do Direito:** {', '.join(row['ramos'])}") # Pre-aggregated by Dataset.record
+        st.markdown(f"**Área(s) de Estudo:** {', '.join(row['areas'])}")
         
         # Display 'tese_julgamento' as the main content
         st.markdown("**Tese / Notícia Completa:**")
@@ -212,7 +253,19 @@ def render_card(row, context="informativos"):
         if row['Legislação']:
             st.markdown(f"**Legislação:** {row['Legislação']}")
         st.markdown(f"**Repercussão Geral:** {row['repercussao_geral']}")
+
+        related_julgados = related_index()
+        neighbours = related_julgados.related(row['row']) if related_julgados is not None else []
+        if neighbours:
+            st.markdown("**Julgados Relacionados:**")
+            julgados = dataset.julgados
+            st.markdown('\n'.join(f"- Inf. {julgados['numero_informativo'].iat[r]} — {julgados['Título'].iat[r]} ({score:.0%} de similaridade)"
+                                   for r, score in neighbours))
         
+        if context == "meta": # Reading progress of the study meta
+            is_read = row['id'] in current_user().read
+            st.button("✅ Lido (desmarcar)" if is_read else "Marcar como lido", key=f"lido_{key_prefix}", on_click=toggle_read, args=(row['id'],))
+
         # Only show action buttons in the main 'Informativos' tab context
         if context == "informativos":
             col1, col2 = st.columns(2)
@@ -221,7 +274,40 @@ def render_card(row, context="informativos"):
             with col2:
                 st.button("Ver Caso Prático", key=f"caso_{key_prefix}", on_click=select_julgado_for_caso, args=(row['id'],))
 
-def render_table(df):
+def read_export(path):
+    # Only for files up to export.MAX_DOWNLOAD_BYTES: st.download_button keeps the bytes in memory
+    with open(path, 'rb') as f:
+        return f.read()
+
+def render_export(rows):
+    # The file is written only on click; with static serving the browser then downloads it straight from disk
+    static = st.get_option('server.enableStaticServing')
+    directory = export.STATIC_EXPORT_DIR if static else export.EXPORT_DIR
+    col_format, col_button = st.columns([1, 3])
+    with col_format:
+        fmt = st.selectbox("Formato", list(export.FORMATS), key='formato_exportacao', label_visibility="collapsed")
+    with col_button:
+        extension, mime = export.FORMATS[fmt]
+        file_name = f"informativos_stf_{len(rows)}_julgados.{extension}"
+        path = export.cached_export(dataset, rows, fmt, directory)
+        if path is None:
+            if not st.button(f"⬇️ Exportar {len(rows)} julgados ({fmt})", disabled=not len(rows), key='exportar'):
+                return
+            with st.spinner("Gerando arquivo..."):
+                path = export.export_file(dataset, rows, fmt, directory)
+        size = os.path.getsize(path)
+        label = f"⬇️ Baixar {len(rows)} julgados ({fmt}, {size / 1024 / 1024:.1f} MB)"
+        if static and size <= export.MAX_STATIC_BYTES:
+            st.markdown(f'<a href="{export.static_url(path)}" download="{file_name}">{label}</a>', unsafe_allow_html=True)
+        elif size <= export.MAX_DOWNLOAD_BYTES:
+            st.download_button(label, functools.partial(read_export, path), file_name=file_name, mime=mime,
+                               on_click='ignore', key='baixar_exportacao')
+        else:
+            st.warning(f"O arquivo tem {size / 1024 / 1024:.0f} MB, acima do limite de download pelo app. "
+                       "Refine os filtros ou escolha Parquet (menor).")
+
+def render_table(rows):
+    # Receives only the current page's row codes; formatting is done for those rows alone
     cols_to_show = {
         'numero_informativo': 'Informativo',
         'data_julgamento': 'Data',
@@ -231,193 +317,401 @@ def render_table(df):
         'area_estudo': 'Área Estudo',
         'repercussao_geral': 'RG'
     }
-    existing_cols = [col for col in cols_to_show.keys() if col in df.columns]
-    df_display = df[existing_cols].rename(columns=cols_to_show)
+    existing_cols = [col for col in cols_to_show.keys() if col in dataset.julgados.columns]
+    df = dataset.julgados[existing_cols].iloc[rows]
+    df['ramo_direito'], df['area_estudo'] = dataset.aggregate_ramos(rows)
+    df_display = df[[col for col in cols_to_show.keys() if col in df.columns]].rename(columns=cols_to_show)
     if 'Data' in df_display.columns:
         df_display['Data'] = df_display['Data'].dt.strftime('%d/%m/%Y')
-    st.dataframe(df_display, use_container_width=True)
+    st.dataframe(df_display, use_container_width=True, hide_index=True)
 
-# --- Carregar Dados ---
-data_path = "Dados_InformativosSTF.xlsx" # Use relative path for deployment
-df_informativos_exploded = load_data(data_path)
+def bar_chart_spec(counts, field, title, horizontal=True):
+    data = pd.DataFrame({field: list(map(str, counts)), 'Julgados': list(counts.values())})
+    data = data[data['Julgados'] > 0]
+    if horizontal: # Categories sorted by count, longest bar on top
+        encoding = {'y': alt.Y(f'{field}:N', sort='-x', title=None), 'x': alt.X('Julgados:Q', title="Julgados únicos")}
+    else:
+        encoding = {'x': alt.X(f'{field}:O', title=None), 'y': alt.Y('Julgados:Q', title="Julgados únicos")}
+    return alt.Chart(data, title=title).mark_bar().encode(tooltip=[field, 'Julgados'], **encoding).to_dict()
+
+def stat_chart_specs(summary):
+    rg = pd.DataFrame({'Repercussão Geral': list(summary['repercussao_geral']), 'Julgados': list(summary['repercussao_geral'].values())})
+    return {
+        'ramo': bar_chart_spec(summary['ramo_direito'], 'Ramo do Direito', "Julgados por Ramo do Direito"),
+        'area': bar_chart_spec(summary['area_estudo'], 'Área de Estudo', "Julgados por Área de Estudo"),
+        'ano': bar_chart_spec(summary['ano_julgamento'], 'Ano', "Julgados Únicos por Ano", horizontal=False),
+        'rg': alt.Chart(rg[rg['Julgados'] > 0], title="Repercussão Geral").mark_arc().encode(
+            theta='Julgados:Q', color=alt.Color('Repercussão Geral:N'), tooltip=['Repercussão Geral', 'Julgados']).to_dict(),
+    }
 
-# --- Estrutura Principal do App (Atualizado V4) ---
-if df_informativos_exploded is not None:
-    st.success(f"{df_informativos_exploded['id'].nunique()} julgados únicos ({len(df_informativos_exploded)} linhas/ramos) carregados.")
+# --- Paginação (Cards e Tabela) ---
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+
+def change_page(delta):
+    st.session_state.page_cursor = max(0, st.session_state.page_cursor + delta)
+
+def reset_page():
+    st.session_state.page_cursor = 0
+
+def current_page(total_items, result_signature):
+    # New filters/search start again from the first page
+    if st.session_state.page_signature != result_signature:
+        st.session_state.page_signature = result_signature
+        st.session_state.page_cursor = 0
+    page_size = st.session_state.get('page_size', PAGE_SIZE_OPTIONS[0])
+    n_pages = max(1, -(-total_items // page_size))
+    st.session_state.page_cursor = min(st.session_state.page_cursor, n_pages - 1)
+    start = st.session_state.page_cursor * page_size
+    return start, min(start + page_size, total_items), n_pages
+
+def render_pagination(total_items, start, end, n_pages):
+    col_prev, col_info, col_next, col_size = st.columns([1, 3, 1, 2], vertical_alignment="center")
+    with col_prev:
+        st.button("◀ Anterior", key="page_prev", on_click=change_page, args=(-1,), disabled=st.session_state.page_cursor == 0)
+    with col_info:
+        st.caption(f"Página {st.session_state.page_cursor + 1} de {n_pages} — julgados {start + 1 if total_items else 0} a {end} de {total_items}")
+    with col_next:
+        st.button("Próxima ▶", key="page_next", on_click=change_page, args=(1,), disabled=st.session_state.page_cursor >= n_pages - 1)
+    with col_size:
+        st.selectbox("Itens por página", PAGE_SIZE_OPTIONS, key='page_size', on_change=reset_page, label_visibility="collapsed",
+                     format_func=lambda size: f"{size} por página")
+
+# --- Abas (cada aba é um fragmento: seus widgets reexecutam só a própria aba) ---
+def timed_view(stage):
+    # A fragment-only rerun doesn't run the script body, so the full run's trace is already finished:
+    # it gets a trace of its own, timed as 'rerun.fragmento'
+    def decorate(view):
+        @functools.wraps(view)
+        def run():
+            global trace
+            if trace.total is None: # Part of a full script run
+                with trace.span(stage):
+                    view()
+                return
+            trace = perf.RerunTrace(get_metrics(), total_stage='rerun.fragmento')
+            try:
+                with trace.span(stage):
+                    view()
+            finally:
+                trace.finish()
+            if trace.enabled and is_admin(): # The sidebar panel is outside the fragment, so it can't be updated from here
+                with st.expander("⏱️ Desempenho deste rerun da aba (admin)"):
+                    render_trace(trace)
+        return run
+    return decorate
+
+def begin_view():
+    # Callbacks can't call st.rerun(), so the fragment does it when the sidebar is stale (see toggle_favorite)
+    if st.session_state.pop('full_rerun_pending', False):
+        st.rerun(scope="app")
+    while st.session_state.pending_toasts:
+        st.toast(st.session_state.pending_toasts.pop(0))
+
+def view_result_rows():
+    # Sidebar rows + keyword search; shared by Informativos and Metas (the search box lives in Informativos)
+    search_query = st.session_state.get('busca', "")
+    if not search_query:
+        return filtered_rows, search_query
+    # Search Título, tese_julgamento, Resumo through the inverted index, ranked by BM25
+    with trace.span('busca'):
+        return search_results(selections, show_favorites_only, search_query, filtered_rows), search_query
+
+@st.fragment
+@timed_view('aba.informativos')
+def view_informativos():
+    begin_view()
+    st.header("Consulta aos Informativos")
+    st.text_input("Buscar por palavra-chave", key='busca', placeholder="Digite termos para buscar no Título, Tese/Notícia ou Resumo...",
+                  help='Ignora acentos e variações (ex.: "repercussões" = "repercussao"). Use "aspas" para frases e * para prefixos (ex.: constitu*).')
+    result_rows, search_query = view_result_rows() # Row codes only; rows are sliced per page below
+    if search_query:
+        st.write(f"Mostrando {len(result_rows)} julgados únicos que correspondem à busca ")
+    else:
+        st.write(f"Mostrando {len(result_rows)} julgados únicos com base nos filtros.")
+
+    view_mode = st.radio("Modo de Visualização:", ["Cards", "Tabela"], horizontal=True, key='modo_visualizacao', label_visibility="collapsed")
+    render_export(result_rows)
+
+    # --- Diálogo/Modal para Caso Prático ---
+    if st.session_state.show_caso_pratico_dialog and st.session_state.selected_julgado_id_caso:
+        julgado_caso = dataset.record(st.session_state.selected_julgado_id_caso)
+        if julgado_caso is not None:
+            with st.container(border=True):
+                st.subheader(f"Caso Prático (Simulado) - {julgado_caso['Título']}")
+                st.markdown(f"**Baseado no Informativo:** {julgado_caso['numero_informativo']} | **Data:** {julgado_caso['data_julgamento'].strftime('%d/%m/%Y') if pd.notna(julgado_caso['data_julgamento']) else 'N/A'}")
+                content, stale = generated_content(julgado_caso)
+                if content is None:
+                    st.info("Caso prático ainda não gerado para este julgado. Execute `python generate_content.py` para gerar o conteúdo.")
+                else:
+                    caso = content['caso']
+                    if stale:
+                        st.caption("⚠️ O julgado foi atualizado depois da geração deste caso; execute `python generate_content.py` novamente.")
+                    st.markdown("**Situação Hipotética:**")
+                    st.markdown(caso['situacao'])
+                    st.markdown(f"**Pergunta:** {caso['pergunta']}")
+                    with st.expander("Ver resposta"):
+                        st.markdown(f"**Resposta:** {caso['resposta']}")
+                        if caso['fundamento']:
+                            st.markdown(f"**Fundamento:** {caso['fundamento']}")
+                        st.caption(caso['referencia'])
+                st.button("Fechar Caso Prático", key=f"close_caso_{st.session_state.selected_julgado_id_caso}", on_click=close_caso_pratico)
+            st.divider()
+        else:
+            st.warning("Julgado selecionado para caso prático não encontrado nos dados.")
+            st.session_state.show_caso_pratico_dialog = False
+            st.session_state.selected_julgado_id_caso = None
+
+    # --- Exibição dos Resultados (paginada) ---
+    result_signature = (repr(sorted(selections.items())), show_favorites_only, search_query)
+    page_start, page_end, n_pages = current_page(len(result_rows), result_signature)
+    page_rows = result_rows[page_start:page_end]
+    if view_mode == "Cards":
+        st.write("**Resultados em Cards:**")
+        if len(result_rows):
+            with trace.span('render.cards'):
+                for row_code in page_rows:
+                    render_card(dataset.record_at(row_code), context="informativos") # Pass context
+            render_pagination(len(result_rows), page_start, page_end, n_pages)
+        else:
+            st.info("Nenhum informativo encontrado com os filtros e busca aplicados.")
+    else:
+        st.write("**Resultados em Tabela:**")
+        if len(result_rows):
+            with trace.span('render.tabela'):
+                render_table(page_rows)
+            render_pagination(len(result_rows), page_start, page_end, n_pages)
+        else:
+            st.info("Nenhum informativo encontrado com os filtros e busca aplicados.")
+
+@st.fragment
+@timed_view('aba.estatisticas')
+def view_estatisticas():
+    begin_view()
+    # Charts come from the count cube (stats_cube.py); specs are cached per selection
+    st.header("Estatísticas Gerais")
+    st.write(f"Visualizações sobre os {len(filtered_rows)} julgados únicos ({filtered_link_count} vínculos julgado/ramo) filtrados pela barra lateral.")
+    if len(filtered_rows):
+        chart_specs = stats_charts(selections, show_favorites_only, filtered_rows)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.vega_lite_chart(chart_specs['ramo'], use_container_width=True)
+            st.vega_lite_chart(chart_specs['ano'], use_container_width=True)
+        with col2:
+            st.vega_lite_chart(chart_specs['area'], use_container_width=True)
+            st.vega_lite_chart(chart_specs['rg'], use_container_width=True)
+    else: st.info("Não há dados filtrados (sidebar) para exibir estatísticas.")
+
+@st.fragment
+@timed_view('aba.assertivas')
+def view_assertivas():
+    begin_view()
+    # Assertivas are generated offline (generate_content.py); this only reads them from the content store
+    st.header("Gerador de Assertivas")
+    julgado_id = st.session_state.selected_julgado_id_assertiva
+    if not julgado_id:
+        st.info("Clique em 'Gerar Assertivas' em um julgado da aba Informativos.")
+        return
+    record = dataset.record(julgado_id)
+    if record is None:
+        st.warning("Julgado selecionado para assertivas não encontrado nos dados.")
+        return
+    st.subheader(f"{record['Título']} (Inf. {record['numero_informativo']})")
+    content, stale = generated_content(record)
+    if content is None:
+        st.info("Assertivas ainda não geradas para este julgado. Execute `python generate_content.py` para gerar o conteúdo.")
+        return
+    if stale:
+        st.caption("⚠️ O julgado foi atualizado depois da geração destas assertivas; execute `python generate_content.py` novamente.")
+    st.write("Julgue as assertivas abaixo como verdadeiras ou falsas:")
+    for i, assertiva in enumerate(content['assertivas'], 1):
+        with st.container(border=True):
+            st.markdown(f"**{i}.** {assertiva['enunciado']}")
+            with st.expander("Gabarito"):
+                st.markdown(assertiva['justificativa']) # Starts with "Verdadeiro."/"Falso."
+
+@st.fragment
+@timed_view('aba.perguntas')
+def view_perguntas():
+    begin_view()
+    # ... (Perguntas - sem mudanças significativas) ...
+    st.header("Perguntas sobre os Julgados")
+    # ...
+
+@st.fragment
+@timed_view('aba.metas')
+def view_metas(): # Metas de Estudo (Atualizado V4 - Clickable)
+    begin_view()
+    st.header("🎯 Metas de Estudo")
+    st.write("Defina uma meta de leitura selecionando a quantidade de julgados aleatórios (baseado nos filtros atuais)." )
+    num_blocos = st.number_input("Quantidade de Julgados para Ler:", min_value=1, max_value=50, step=1, key='meta_quantidade')
+
+    if st.button("Gerar Meta de Leitura Aleatória"):
+        st.info(f"Gerando {num_blocos} julgados aleatórios para leitura...")
+        available_julgados = view_result_rows()[0] # Filtered/searched row codes, same as the Informativos tab
+        julgado_ids = dataset.julgados['id']
+        if len(available_julgados) >= num_blocos:
+            sampled_ids = [julgado_ids.iat[row] for row in random.sample(list(available_julgados), num_blocos)]
+            start_meta(sampled_ids) # Store the list of IDs and reset selection
+        elif len(available_julgados):
+             st.warning(f"Não há {num_blocos} julgados únicos disponíveis. Mostrando {len(available_julgados)}.")
+             start_meta(julgado_ids.iloc[available_julgados].tolist())
+        else:
+            st.warning("Nenhum julgado disponível com os filtros atuais para gerar a meta.")
+            start_meta([])
+        # No st.rerun(): the list below is drawn from session_state in this same fragment run
+
+    user = current_user()
+    if st.session_state.current_study_meta_ids is None: # New session: pick up the user's last meta
+        st.session_state.current_study_meta_ids = user.metas[0][1] if user.metas else []
+
+    # Display the list of study goals if generated
+    if st.session_state.current_study_meta_ids:
+        st.subheader("Sua Meta de Leitura Atual:")
+        meta_julgados = [dataset.record(julgado_id) for julgado_id in st.session_state.current_study_meta_ids]
+        meta_julgados = {row['id']: row for row in meta_julgados if row is not None}
+        n_read = sum(julgado_id in user.read for julgado_id in meta_julgados)
+        st.progress(n_read / max(len(meta_julgados), 1), text=f"Lidos: {n_read} de {len(meta_julgados)}")
+
+        cols = st.columns(max(len(meta_julgados), 1)) # Create columns for buttons
+        for i, row in enumerate(meta_julgados.values()):
+            date_str = row['data_julgamento'].strftime('%d/%m/%Y') if pd.notna(row['data_julgamento']) else 'N/A'
+            button_label = f"{'✅ ' if row['id'] in user.read else ''}Inf. {row['numero_informativo']} ({date_str})"
+            # Use columns for horizontal layout
+            with cols[i]:
+                 if st.button(button_label, key=f"meta_select_{row['id']}", on_click=select_meta_julgado, args=(row['id'],), use_container_width=True):
+                     pass # Callback handles the state change
+
+        st.divider()
+        # Display the selected julgado's card if one is selected
+        if st.session_state.selected_meta_julgado_id:
+            selected_row = meta_julgados.get(st.session_state.selected_meta_julgado_id)
+            if selected_row is not None:
+                st.subheader("Detalhes do Julgado Selecionado:")
+                render_card(selected_row, context="meta") # Pass context 'meta'
+            else:
+                st.warning("Julgado selecionado não encontrado.")
+                st.session_state.selected_meta_julgado_id = None # Reset if not found
+
+    if len(user.metas) > 1:
+        with st.expander("Metas anteriores"):
+            for created_at, julgado_ids in user.metas[1:]:
+                n_read = sum(julgado_id in user.read for julgado_id in julgado_ids)
+                col_meta, col_resume = st.columns([4, 1], vertical_alignment="center")
+                col_meta.write(f"{datetime.fromtimestamp(created_at).strftime('%d/%m/%Y %H:%M')} — {len(julgado_ids)} julgados, {n_read} lidos")
+                col_resume.button("Retomar", key=f"retomar_meta_{created_at}", on_click=resume_meta, args=(julgado_ids,))
+
+VIEWS = {
+    "🔍 Informativos": view_informativos,
+    "📊 Estatísticas": view_estatisticas,
+    "✅ Assertivas": view_assertivas,
+    "❓ Perguntas": view_perguntas,
+    "🎯 Metas de Estudo": view_metas,
+}
+
+# --- Painel de Desempenho (admin) ---
+def render_trace(rerun_trace):
+    st.caption(f"Este rerun: {rerun_trace.total * 1000:.0f} ms")
+    st.dataframe(pd.DataFrame([{'Etapa': '· ' * depth + stage, 'ms': round(seconds * 1000, 1)}
+                               for depth, stage, seconds in rerun_trace.spans if seconds is not None]),
+                 use_container_width=True, hide_index=True)
+
+def render_perf_panel(panel, metrics):
+    # Filled at the end of the script, once this rerun's spans are closed
+    with panel:
+        render_trace(trace)
+        summary = metrics.summary()
+        if summary:
+            st.caption("Todas as sessões (janela deslizante por etapa)")
+            st.dataframe(pd.DataFrame.from_dict(summary, orient='index').round(1), use_container_width=True)
+        st.download_button("Exportar métricas (JSON)", metrics.to_json(), file_name="metricas_informativos.json", mime="application/json")
+        st.button("Zerar métricas", on_click=metrics.reset)
+
+# --- Carregar Dados ---
+trace = perf.RerunTrace(get_metrics())
+perf_panel = None
+data_path = os.environ.get("INFORMATIVOS_DATA_PATH", "Dados_InformativosSTF.xlsx") # Use relative path for deployment
+with trace.span('carregar_dados'):
+    dataset = load_data(data_path, snapshot_token(data_path))
+if dataset is None:
+    load_data.clear() # Don't keep the failure cached: the next rerun tries again
+
+# --- Estrutura Principal do App (Atualizado V6) ---
+if dataset is not None:
+    df_julgados = dataset.julgados # One row per julgado
+    df_ramos = dataset.ramos # Link table: row code -> ramo_direito / area_estudo
+    st.success(f"{len(df_julgados)} julgados únicos ({len(df_ramos)} vínculos julgado/ramo) carregados.")
 
     # --- Barra Lateral (Sidebar) ---
     st.sidebar.header("Filtros Avançados")
-    # ... (Filtros da Sidebar - sem mudanças na lógica, mas usam dados do df_informativos_exploded) ...
-    anos_disponiveis = sorted(df_informativos_exploded['ano_julgamento'].dropna().unique().astype(int), reverse=True) if 'ano_julgamento' in df_informativos_exploded.columns and df_informativos_exploded['ano_julgamento'].notna().any() else []
-    meses_anos_disponiveis = sorted(df_informativos_exploded['ano_mes_julgamento'].dropna().unique(), reverse=True) if 'ano_mes_julgamento' in df_informativos_exploded.columns and df_informativos_exploded['ano_mes_julgamento'].notna().any() else []
-    ramos_disponiveis = sorted(df_informativos_exploded['ramo_direito'].dropna().unique()) if 'ramo_direito' in df_informativos_exploded.columns else []
-    areas_disponiveis = sorted(df_informativos_exploded['area_estudo'].dropna().unique()) if 'area_estudo' in df_informativos_exploded.columns else []
-    classes_disponiveis = sorted(df_informativos_exploded['classe_processo'].dropna().unique()) if 'classe_processo' in df_informativos_exploded.columns else []
-    informativos_disponiveis = sorted(df_informativos_exploded.drop_duplicates(subset=['id'])['numero_informativo'].dropna().unique()) if 'numero_informativo' in df_informativos_exploded.columns else []
+    with trace.span('filtros.motor'):
+        filter_engine = build_filter_engine(dataset.version, dataset)
+    result_cache = get_result_cache()
+    anos_disponiveis = sorted(filter_engine.values['ano_julgamento'], reverse=True)
+    meses_anos_disponiveis = sorted(filter_engine.values['ano_mes_julgamento'], reverse=True)
+    ramos_disponiveis = sorted(filter_engine.values['ramo_direito'])
+    areas_disponiveis = sorted(filter_engine.values['area_estudo'])
+    classes_disponiveis = sorted(filter_engine.values['classe_processo'])
+    informativos_disponiveis = sorted(filter_engine.values['numero_informativo'])
     rg_options = ['Todos', 'Sim', 'Não', 'Não Informado']
 
-    date_filter_type = st.sidebar.radio("Filtrar Data Por:", ["Ano", "Mês/Ano"], index=0)
+    # Facet counts come from the previous widget values (already in session_state at the start of a rerun)
+    state = st.session_state
+    pending_date_type = state.get('filtro_data_tipo', "Ano")
+    pending_selections = build_selections(
+        pending_date_type, state.get('filtro_anos', anos_disponiveis), state.get('filtro_meses_anos', []),
+        state.get('filtro_areas', []), state.get('filtro_ramos', []), state.get('filtro_classes', []),
+        state.get('filtro_informativo', "Todos"), state.get('filtro_rg', "Todos"))
+    with trace.span('filtros.contagens'):
+        facet_counts = sidebar_results(pending_selections, state.get('filtro_favoritos', False))['facet_counts']
+
+    def with_count(facet):
+        return lambda value: value if value == "Todos" else f"{value} ({facet_counts[facet].get(value, 0)})"
+
+    date_filter_type = st.sidebar.radio("Filtrar Data Por:", ["Ano", "Mês/Ano"], index=0, key='filtro_data_tipo')
     selected_anos = []
     selected_meses_anos = []
     if date_filter_type == "Ano":
-        selected_anos = st.sidebar.multiselect("Ano do Julgamento", anos_disponiveis, default=anos_disponiveis)
+        selected_anos = st.sidebar.multiselect("Ano do Julgamento", anos_disponiveis, default=anos_disponiveis, key='filtro_anos', format_func=with_count('ano_julgamento'))
     else:
-        selected_meses_anos = st.sidebar.multiselect("Mês/Ano do Julgamento", meses_anos_disponiveis, default=[])
-
-    selected_areas = st.sidebar.multiselect("Área de Estudo (Simulado IA)", areas_disponiveis, default=[])
-    selected_ramos = st.sidebar.multiselect("Ramo do Direito (Específico)", ramos_disponiveis, default=[])
-    selected_classes = st.sidebar.multiselect("Classe Processual", classes_disponiveis, default=[])
-    selected_informativo = st.sidebar.selectbox("Número do Informativo (opcional)", ["Todos"] + informativos_disponiveis, index=0)
-    selected_rg = st.sidebar.radio("Repercussão Geral", rg_options, index=0)
-    show_favorites_only = st.sidebar.checkbox("Mostrar Apenas Favoritos", value=False)
-
-    # Aplicar Filtros
-    df_filtered_sidebar = df_informativos_exploded.copy()
-    if date_filter_type == "Ano" and selected_anos and 'ano_julgamento' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['ano_julgamento'].isin(selected_anos)]
-    elif date_filter_type == "Mês/Ano" and selected_meses_anos and 'ano_mes_julgamento' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['ano_mes_julgamento'].isin(selected_meses_anos)]
-    if selected_areas and 'area_estudo' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['area_estudo'].isin(selected_areas)]
-    if selected_ramos and 'ramo_direito' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['ramo_direito'].isin(selected_ramos)]
-    if selected_classes and 'classe_processo' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['classe_processo'].isin(selected_classes)]
-    if selected_informativo != "Todos" and 'numero_informativo' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['numero_informativo'] == selected_informativo]
-    if selected_rg != "Todos" and 'repercussao_geral' in df_filtered_sidebar.columns:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['repercussao_geral'] == selected_rg]
-    if show_favorites_only:
-        df_filtered_sidebar = df_filtered_sidebar[df_filtered_sidebar['id'].isin(st.session_state.favorites)]
-
-    st.sidebar.metric("Julgados Filtrados (Ramos Individuais)", len(df_filtered_sidebar))
-    st.sidebar.metric("Julgados Únicos Filtrados", df_filtered_sidebar['id'].nunique())
-
-    # --- Abas --- 
-    tabs = ["🔍 Informativos", "📊 Estatísticas", "✅ Assertivas", "❓ Perguntas", "🎯 Metas de Estudo"]
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(tabs)
-
-    with tab1:
-        st.header("Consulta aos Informativos")
-        search_query = st.text_input("Buscar por palavra-chave", placeholder="Digite termos para buscar no Título, Tese/Notícia ou Resumo...")
-        df_final_filtered = df_filtered_sidebar.copy()
-        if search_query:
-            # Search Título, tese_julgamento, Resumo
-            search_mask = (df_final_filtered['Título'].str.contains(search_query, case=False, regex=True, na=False) |
-                           df_final_filtered['tese_julgamento'].str.contains(search_query, case=False, regex=True, na=False) |
-                           df_final_filtered['Resumo'].str.contains(search_query, case=False, regex=True, na=False))
-            df_final_filtered = df_final_filtered[search_mask]
-            st.write(f"Mostrando {df_final_filtered['id'].nunique()} julgados únicos ({len(df_final_filtered)} linhas/ramos) que correspondem à busca ")
-        else:
-            st.write(f"Mostrando {df_final_filtered['id'].nunique()} julgados únicos ({len(df_final_filtered)} linhas/ramos) com base nos filtros.")
-        
-        view_mode = st.radio("Modo de Visualização:", ["Cards", "Tabela"], horizontal=True, label_visibility="collapsed")
-
-        # --- Diálogo/Modal para Caso Prático ---
-        if st.session_state.show_caso_pratico_dialog and st.session_state.selected_julgado_id_caso:
-            try:
-                julgado_caso = df_final_filtered[df_final_filtered['id'] == st.session_state.selected_julgado_id_caso].iloc[0]
-                with st.container(border=True):
-                    st.subheader(f"Caso Prático (Simulado) - {julgado_caso['Título']}")
-                    st.markdown(f"**Baseado no Informativo:** {julgado_caso['numero_informativo']} | **Data:** {julgado_caso['data_julgamento'].strftime('%d/%m/%Y') if pd.notna(julgado_caso['data_julgamento']) else 'N/A'}")
-                    st.markdown("**Situação Hipotética:**")
-                    st.markdown("_(Aqui seria apresentado um caso prático realista e explicativo...)_ ")
-                    st.markdown("**Exemplo Simulado:** João entrou com uma ação buscando a revisão de sua aposentadoria... A decisão do STF impacta diretamente seu caso, pois...")
-                    if st.button("Fechar Caso Prático", key=f"close_caso_{st.session_state.selected_julgado_id_caso}"):
-                        st.session_state.show_caso_pratico_dialog = False
-                        st.session_state.selected_julgado_id_caso = None
-                        st.rerun()
-                st.divider()
-            except IndexError:
-                st.warning("Julgado selecionado para caso prático não encontrado nos dados filtrados/buscados.")
-                st.session_state.show_caso_pratico_dialog = False
-                st.session_state.selected_julgado_id_caso = None
-
-        # --- Exibição dos Resultados ---
-        df_display_unique = df_final_filtered.drop_duplicates(subset=['id'])
-        if view_mode == "Cards":
-            st.write("**Resultados em Cards:**")
-            if not df_display_unique.empty:
-                limit = 10
-                for index, row in df_display_unique.head(limit).iterrows():
-                    render_card(row, context="informativos") # Pass context
-                if len(df_display_unique) > limit:
-                    st.caption(f"Mostrando os primeiros {limit} de {len(df_display_unique)} julgados únicos.")
-            else:
-                st.info("Nenhum informativo encontrado com os filtros e busca aplicados.")
-        else:
-            st.write("**Resultados em Tabela (Ramos Individuais):**")
-            if not df_final_filtered.empty:
-                render_table(df_final_filtered)
-            else:
-                st.info("Nenhum informativo encontrado com os filtros e busca aplicados.")
-
-    with tab2:
-        # ... (Estatísticas - sem mudanças significativas, mas usam dados atualizados) ...
-        st.header("Estatísticas Gerais")
-        st.write(f"Visualizações sobre os {df_filtered_sidebar['id'].nunique()} julgados únicos ({len(df_filtered_sidebar)} linhas/ramos) filtrados pela barra lateral.")
-        if not df_filtered_sidebar.empty:
-            col1, col2 = st.columns(2)
-            # ... (Gráficos Ramo, Área, Ano, RG) ...
-        else: st.info("Não há dados filtrados (sidebar) para exibir estatísticas.")
-
-    with tab3:
-        # ... (Assertivas - sem mudanças significativas) ...
-        st.header("Gerador de Assertivas")
-        # ...
-
-    with tab4:
-        # ... (Perguntas - sem mudanças significativas) ...
-        st.header("Perguntas sobre os Julgados")
-        # ...
-            
-    with tab5: # Metas de Estudo Tab (Atualizado V4 - Clickable)
-        st.header("🎯 Metas de Estudo")
-        st.write("Defina uma meta de leitura selecionando a quantidade de julgados aleatórios (baseado nos filtros atuais)." )
-        num_blocos = st.number_input("Quantidade de Julgados para Ler:", min_value=1, max_value=50, value=5, step=1)
-        
-        if st.button("Gerar Meta de Leitura Aleatória"):
-            st.info(f"Gerando {num_blocos} julgados aleatórios para leitura...")
-            available_julgados = df_final_filtered.drop_duplicates(subset=['id'])
-            if len(available_julgados) >= num_blocos:
-                sampled_ids = random.sample(available_julgados['id'].tolist(), num_blocos)
-                st.session_state.current_study_meta_ids = sampled_ids # Store the list of IDs
-                st.session_state.selected_meta_julgado_id = None # Reset selection
-            elif not available_julgados.empty():
-                 st.warning(f"Não há {num_blocos} julgados únicos disponíveis. Mostrando {len(available_julgados)}.")
-                 st.session_state.current_study_meta_ids = available_julgados['id'].tolist()
-                 st.session_state.selected_meta_julgado_id = None # Reset selection
-            else:
-                st.warning("Nenhum julgado disponível com os filtros atuais para gerar a meta.")
-                st.session_state.current_study_meta_ids = []
-                st.session_state.selected_meta_julgado_id = None # Reset selection
-            st.rerun() # Rerun to display the list or selection
-
-        # Display the list of study goals if generated
-        if st.session_state.current_study_meta_ids:
-            st.subheader("Sua Meta de Leitura Atual:")
-            meta_julgados_df = df_informativos_exploded[df_informativos_exploded['id'].isin(st.session_state.current_study_meta_ids)].drop_duplicates(subset=['id'])
-            
-            cols = st.columns(len(meta_julgados_df)) # Create columns for buttons
-            for i, (index, row) in enumerate(meta_julgados_df.iterrows()):
-                date_str = row['data_julgamento'].strftime('%d/%m/%Y') if pd.notna(row['data_julgamento']) else 'N/A'
-                button_label = f"Inf. {row['numero_informativo']} ({date_str})"
-                # Use columns for horizontal layout
-                with cols[i]:
-                     if st.button(button_label, key=f"meta_select_{row['id']}", on_click=select_meta_julgado, args=(row['id'],), use_container_width=True):
-                         pass # Callback handles the state change
-
-            st.divider()
-            # Display the selected julgado's card if one is selected
-            if st.session_state.selected_meta_julgado_id:
-                try:
-                    selected_row = meta_julgados_df[meta_julgados_df['id'] == st.session_state.selected_meta_julgado_id].iloc[0]
-                    st.subheader("Detalhes do Julgado Selecionado:")
-                    render_card(selected_row, context="meta") # Pass context 'meta'
-                except IndexError:
-                    st.warning("Julgado selecionado não encontrado.")
-                    st.session_state.selected_meta_julgado_id = None # Reset if not found
+        selected_meses_anos = st.sidebar.multiselect("Mês/Ano do Julgamento", meses_anos_disponiveis, default=[], key='filtro_meses_anos', format_func=with_count('ano_mes_julgamento'))
+
+    selected_areas = st.sidebar.multiselect("Área de Estudo (Simulado IA)", areas_disponiveis, default=[], key='filtro_areas', format_func=with_count('area_estudo'))
+    selected_ramos = st.sidebar.multiselect("Ramo do Direito (Específico)", ramos_disponiveis, default=[], key='filtro_ramos', format_func=with_count('ramo_direito'))
+    selected_classes = st.sidebar.multiselect("Classe Processual", classes_disponiveis, default=[], key='filtro_classes', format_func=with_count('classe_processo'))
+    selected_informativo = st.sidebar.selectbox("Número do Informativo (opcional)", ["Todos"] + informativos_disponiveis, index=0, key='filtro_informativo', format_func=with_count('numero_informativo'))
+    selected_rg = st.sidebar.radio("Repercussão Geral", rg_options, index=0, key='filtro_rg', format_func=with_count('repercussao_geral'))
+    show_favorites_only = st.sidebar.checkbox("Mostrar Apenas Favoritos", value=False, key='filtro_favoritos')
+
+    # Aplicar Filtros (posting-list intersection; only the final selection is sliced)
+    selections = build_selections(date_filter_type, selected_anos, selected_meses_anos, selected_areas,
+                                  selected_ramos, selected_classes, selected_informativo, selected_rg)
+    with trace.span('filtros.selecao'):
+        sidebar_result = sidebar_results(selections, show_favorites_only)
+    filtered_rows = sidebar_result['rows']
+    filtered_link_count = sidebar_result['link_count']
+
+    st.sidebar.metric("Julgados Filtrados (Ramos Individuais)", filtered_link_count)
+    st.sidebar.metric("Julgados Únicos Filtrados", len(filtered_rows))
+
+    if is_admin():
+        with st.sidebar.expander("⚙️ Cache de resultados (admin)"):
+            cache_stats = result_cache.stats()
+            st.write(f"Entradas: {cache_stats['entries']} / {cache_stats['max_entries']} ({cache_stats['bytes'] / 1024:.0f} KiB de {cache_stats['max_bytes'] / 1024 / 1024:.0f} MiB), TTL {cache_stats['ttl_seconds']:.0f}s")
+            st.write(f"Acertos: {cache_stats['hits']} | Faltas: {cache_stats['misses']} | Taxa de acerto: {cache_stats['hit_rate']:.0%}")
+            st.write(f"Remoções (LRU): {cache_stats['evictions']} | Expiradas: {cache_stats['expirations']} | Invalidações: {cache_stats['invalidations']} | Aguardaram outro cálculo: {cache_stats['coalesced']}")
+            store_stats = get_user_store().stats()
+            st.write(f"Dados de usuários: {store_stats['writes']} gravações em {store_stats['flushes']} transações ({store_stats['pending']} pendentes, {store_stats['users']} usuários em memória)")
+        if trace.enabled:
+            perf_panel = st.sidebar.expander("⏱️ Desempenho (admin)")
+
+    # --- Abas (roteador: só a aba ativa é executada) ---
+    active_view = st.radio("Seção", list(VIEWS), horizontal=True, key='aba_ativa', label_visibility="collapsed")
+    VIEWS[active_view]()
 
 else:
     st.warning("Não foi possível carregar os dados dos informativos. Verifique o arquivo Excel e as mensagens de erro acima.")
 
+trace.finish()
+if perf_panel is not None:
+    render_perf_panel(perf_panel, get_metrics())
+
@@ -0,0 +1,287 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import related
+import search_index
+from filter_engine import FilterEngine
+from stats_cube import StatsCube
+
+# --- Benchmark Headless (carga, filtros, busca, cards e metas) ---
+# Uso: python benchmark.py --scales 1,10 --output bench_results.json [--compare bench_anterior.json]
+# Gera corpora sintéticos com tamanhos de texto e multiplicidade de ramos realistas, mede tempo e
+# pico de memória de cada etapa e grava tudo em JSON para comparar versões.
+
+BASE_JULGADOS = 2000 # ~5 anos de informativos (escala 1x)
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RAMOS = list(data_store.RAMO_TO_AREA_MAP) + ['Direito Agrário', 'Direito Militar']
+RAMO_MULTIPLICITY = ([1, 2, 3, 4], [0.55, 0.30, 0.12, 0.03])
+CLASSES = ['ADI', 'ADC', 'ADPF', 'ADO', 'RE', 'ARE', 'HC', 'RHC', 'MS', 'Rcl', 'Inq', 'AP', 'Pet']
+RG_VALUES = ['Sim', 'Não', None]
+LEGAL_WORDS = (
+    "constitucional inconstitucional constitucionalidade lei norma dispositivo artigo inciso parágrafo competência "
+    "União estados municípios federal estadual municipal tributo imposto contribuição taxa servidor público "
+    "aposentadoria pensão previdência benefício prisão preventiva habeas corpus liberdade pena crime processo "
+    "recurso extraordinário repercussão geral tese julgamento plenário ministro relator acórdão decisão tribunal "
+    "direito fundamental dignidade igualdade legalidade moralidade eficiência publicidade contrato consumidor "
+    "empresa trabalho empregado empregador sindicato eleição partido candidato mandato ambiental urbanístico "
+    "propriedade posse usucapião família casamento união estável saúde educação segurança"
+).split()
+FILLER_WORDS = "de da do dos das em no na a o que para por com ao pela pelo se não é como sobre entre".split()
+TEXT_LENGTHS = {'Título': (8, 20), 'Tese Julgado': (120, 450), 'Resumo': (40, 160)}
+QUERIES = ['repercussão geral', 'prisao preventiva', '"habeas corpus"', 'constitu*', 'servidor aposentadoria',
+           '"contribuição social" tributo', 'usucapião', 'direito fundamental dignidade']
+
+
+def generate_corpus(n_julgados, seed=0):
+    # Zipf-like vocabulary: legal terms are frequent, plus a long tail of rare synthetic words
+    rng = np.random.default_rng(seed)
+    tail = [f"termo{i}" for i in range(max(2000, n_julgados // 2))]
+    vocab = np.array(FILLER_WORDS + LEGAL_WORDS + tail, dtype=object)
+    weights = 1.0 / np.arange(1, len(vocab) + 1) ** 1.1
+    weights /= weights.sum()
+
+    def texts(low, high):
+        lengths = rng.integers(low, high, n_julgados)
+        words = rng.choice(vocab, size=int(lengths.sum()), p=weights)
+        bounds = np.cumsum(lengths)
+        return [' '.join(chunk) for chunk in np.split(words, bounds[:-1])]
+
+    multiplicity = rng.choice(RAMO_MULTIPLICITY[0], size=n_julgados, p=RAMO_MULTIPLICITY[1])
+    ramos = ['; '.join(rng.choice(RAMOS, size=k, replace=False)) for k in multiplicity]
+    dates = pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 365 * 5, n_julgados), unit='D')
+    return pd.DataFrame({
+        'Numero do informativo': 1000 + np.arange(n_julgados) // 10,
+        'Classe Processo': rng.choice(CLASSES, size=n_julgados),
+        'Data Julgamento': dates,
+        'Tese Julgado': texts(*TEXT_LENGTHS['Tese Julgado']),
+        'Ramo Direito': ramos,
+        'Repercussão Geral': rng.choice(np.array(RG_VALUES, dtype=object), size=n_julgados),
+        'Título': texts(*TEXT_LENGTHS['Título']),
+        'Resumo': texts(*TEXT_LENGTHS['Resumo']),
+        'Legislação': [f"CF/1988, art. {a}" for a in rng.integers(1, 250, n_julgados)],
+    })
+
+
+def write_input(df, workdir, fmt):
+    path = os.path.join(workdir, f"Dados_InformativosSTF.{fmt}")
+    if fmt == 'xlsx':
+        df.to_excel(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    return path
+
+
+# --- Medição ---
+TRACE_MEMORY = True
+
+
+def measure(fn, repeat):
+    # Wall time over `repeat` untraced runs (tracemalloc slows Python code several times over),
+    # then one traced run for the Python-heap peak; RSS growth comes from the first run
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    peak = None
+    if TRACE_MEMORY:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    stats = {
+        'seconds_min': min(timings),
+        'seconds_median': statistics.median(timings),
+        'seconds_max': max(timings),
+        'runs': len(timings),
+        'peak_python_bytes': peak,
+        'max_rss_growth_bytes': rss_growth,
+    }
+    return result, stats
+
+
+def sample_selections(engine, count, seed=0):
+    rng = random.Random(seed)
+    selections = []
+    for _ in range(count):
+        selection = {}
+        for facet, probability, max_values in (('ano_julgamento', 0.7, 2), ('area_estudo', 0.4, 2), ('ramo_direito', 0.4, 2),
+                                               ('classe_processo', 0.3, 3), ('repercussao_geral', 0.3, 1)):
+            values = engine.values.get(facet, [])
+            if values and rng.random() < probability:
+                selection[facet] = rng.sample(values, min(len(values), rng.randint(1, max_values)))
+        selections.append(selection)
+    return selections
+
+
+def bench_data_layer(input_path, snapshot_dir, repeat):
+    results = {}
+    (dataset, _), results['load_data_cold'] = measure(lambda: data_store.build_snapshot(input_path, snapshot_dir), 1)
+    (dataset, _), results['load_data_snapshot'] = measure(lambda: data_store.load_snapshot(input_path, snapshot_dir), repeat)
+
+    engine, results['filter_engine_build'] = measure(lambda: FilterEngine(dataset), repeat)
+    selections = sample_selections(engine, 50)
+
+    def filter_chain():
+        for selection in selections:
+            rows = engine.select(selection)
+            engine.facet_counts(selection)
+            engine.count_links(rows, selection)
+    _, results['sidebar_filters_x50'] = measure(filter_chain, repeat)
+
+    cube, results['stats_cube_build'] = measure(lambda: StatsCube(engine), repeat)
+    _, results['stats_summary_x50'] = measure(lambda: [cube.summary(s) for s in selections], repeat)
+
+    index, results['search_index_build'] = measure(lambda: search_index.SearchIndex.build(dataset.julgados, dataset.version), 1)
+    # Offline step (ingest.py); the app only loads the file
+    _, results['related_index_build'] = measure(lambda: related.RelatedIndex.build(dataset.julgados, dataset.version), 1)
+    all_rows = np.arange(len(dataset), dtype=np.int32)
+    _, results[f'keyword_search_x{len(QUERIES)}'] = measure(lambda: [index.search(q, all_rows) for q in QUERIES], repeat)
+
+    # Reference for the old data layout: exploded frame + drop_duplicates(subset=['id'])
+    ramos = dataset.ramos
+    exploded = dataset.julgados.iloc[ramos['row'].to_numpy()].assign(ramo_direito=ramos['ramo_direito'].to_numpy())
+    _, results['drop_duplicates_exploded_legacy'] = measure(lambda: exploded.drop_duplicates(subset=['id']), repeat)
+    del exploded
+
+    rng = np.random.default_rng(1)
+    card_rows = rng.choice(len(dataset), size=min(100, len(dataset)), replace=False)
+    _, results['render_card_lookup_x100'] = measure(lambda: [dataset.record_at(int(r)) for r in card_rows], repeat)
+
+    def metas_sampling():
+        ids = dataset.julgados['id'].to_numpy()
+        sampled = random.sample(list(all_rows), min(10, len(all_rows)))
+        return [dataset.record(ids[r]) for r in sampled]
+    _, results['metas_sampling_x10'] = measure(metas_sampling, repeat)
+    return dataset, results
+
+
+def bench_app(input_path, repeat):
+    # Full Streamlit reruns through AppTest (no browser); caches are warm after the first run
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+
+    os.environ['INFORMATIVOS_DATA_PATH'] = input_path
+    results = {}
+    app = AppTest.from_file(APP_PATH, default_timeout=600)
+    _, results['app_first_run'] = measure(app.run, 1)
+    _, results['app_rerun_cards_page'] = measure(app.run, repeat)
+    app.radio(key='modo_visualizacao').set_value("Tabela")
+    _, results['app_rerun_table_page'] = measure(app.run, repeat)
+    app.radio(key='aba_ativa').set_value("📊 Estatísticas")
+    _, results['app_rerun_stats_tab'] = measure(app.run, repeat)
+    app.radio(key='aba_ativa').set_value("🎯 Metas de Estudo").run()
+    meta_button = next(b for b in app.button if b.label == "Gerar Meta de Leitura Aleatória")
+    _, results['app_metas_button'] = measure(lambda: meta_button.click().run(), repeat)
+    errors = [e.message for e in app.exception]
+    if errors:
+        print(f"Aviso: exceções no app durante o benchmark: {errors}")
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    return results
+
+
+def run(args):
+    records = []
+    for scale in args.scales:
+        n_julgados = BASE_JULGADOS * scale
+        fmt = 'xlsx' if scale <= args.max_excel_scale else 'parquet'
+        print(f"=== Escala {scale}x: {n_julgados} julgados ({fmt}) ===")
+        with tempfile.TemporaryDirectory() as workdir:
+            corpus = generate_corpus(n_julgados, seed=scale)
+            input_path = write_input(corpus, workdir, fmt)
+            del corpus
+            snapshot_dir = os.path.join(workdir, data_store.SNAPSHOT_DIR)
+            dataset, results = bench_data_layer(input_path, snapshot_dir, args.repeat)
+            sizes = {'n_julgados': len(dataset), 'n_links': len(dataset.ramos), 'input_format': fmt,
+                     'input_bytes': os.path.getsize(input_path)}
+            del dataset
+            if not args.no_app:
+                cwd = os.getcwd()
+                os.chdir(workdir) # The app keeps its snapshot in a relative directory
+                try:
+                    results.update(bench_app(input_path, args.repeat))
+                finally:
+                    os.chdir(cwd)
+        for stage, stats in results.items():
+            records.append({'scale': scale, **sizes, 'stage': stage, **stats})
+            peak = stats['peak_python_bytes']
+            memory = f"  (pico Python {peak / 2**20:8.1f} MiB)" if peak is not None else ""
+            print(f"  {stage:<36} {stats['seconds_median'] * 1000:10.1f} ms{memory}")
+    return records
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(APP_PATH)).stdout.strip()
+    except OSError:
+        commit = ''
+    import streamlit
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+def compare(records, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['scale'], r['stage']): r for r in json.load(f)['results']}
+    print(f"\n=== Comparação com {baseline_path} (mediana; >1.0 = mais lento) ===")
+    for record in records:
+        old = baseline.get((record['scale'], record['stage']))
+        if old and old['seconds_median'] > 0:
+            ratio = record['seconds_median'] / old['seconds_median']
+            flag = "  <-- regressão" if ratio > 1.2 else ""
+            print(f"  {record['scale']:>4}x {record['stage']:<36} {ratio:6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headless do dashboard de Informativos STF.")
+    parser.add_argument('--scales', default="1,10", type=lambda v: [int(s) for s in v.split(',')],
+                        help="Multiplicadores do corpus base (ex.: 1,10,100)")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições por etapa (carga a frio roda uma vez)")
+    parser.add_argument('--max-excel-scale', type=int, default=10, help="Acima desta escala a entrada é gerada em Parquet")
+    parser.add_argument('--no-app', action='store_true', help="Não executa as etapas com o app Streamlit (AppTest)")
+    parser.add_argument('--no-memory', action='store_true', help="Não mede o pico de memória (tracemalloc)")
+    parser.add_argument('--output', default="bench_results.json")
+    parser.add_argument('--compare', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    global TRACE_MEMORY
+    TRACE_MEMORY = not args.no_memory
+    records = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment_info(), 'base_julgados': BASE_JULGADOS, 'results': records}, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+    if args.compare:
+        compare(records, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- Conteúdo Gerado (assertivas e casos práticos) ---
+# Written offline by generate_content.py; the app only reads one row per julgado.
+DB_PATH = os.environ.get('INFORMATIVOS_CONTENT_DB', 'informativos_conteudo.sqlite3')
+GENERATOR_VERSION = 1 # Bump whenever the generation rules/templates change: every julgado is regenerated
+CONTENT_FIELDS = ['Título', 'tese_julgamento', 'Resumo', 'Legislação', 'numero_informativo', 'classe_processo', 'repercussao_geral']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    julgado_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, assertivas TEXT NOT NULL, caso TEXT NOT NULL,
+    generated_at REAL NOT NULL) WITHOUT ROWID;
+"""
+
+
+def content_hash(record, ramos=()):
+    # Everything the generator reads, plus its version
+    payload = [GENERATOR_VERSION] + [str(record.get(field, '')) for field in CONTENT_FIELDS] + sorted(map(str, ramos))
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()[:32]
+
+
+class ContentStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL") # The app keeps reading while the batch job writes
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, julgado_id):
+        # -> {'content_hash', 'assertivas': [...], 'caso': {...}} or None
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash, assertivas, caso FROM content WHERE julgado_id = ?",
+                                     (str(julgado_id),)).fetchone()
+        if row is None:
+            return None
+        return {'content_hash': row[0], 'assertivas': json.loads(row[1]), 'caso': json.loads(row[2])}
+
+    def hashes(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT julgado_id, content_hash FROM content"))
+
+    def put_many(self, items):
+        # items: [(julgado_id, content_hash, assertivas, caso)]; one transaction = one checkpoint
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO content VALUES (?, ?, ?, ?, ?)",
+                                       [(str(julgado_id), digest, json.dumps(assertivas, ensure_ascii=False),
+                                         json.dumps(caso, ensure_ascii=False), now)
+                                        for julgado_id, digest, assertivas, caso in items])
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove_missing(self, julgado_ids):
+        # Drops content of julgados no longer in the data
+        keep = set(map(str, julgado_ids))
+        stale = [(julgado_id,) for julgado_id in self.hashes() if julgado_id not in keep]
+        with self._lock:
+            self._conn.executemany("DELETE FROM content WHERE julgado_id = ?", stale)
+        return len(stale)
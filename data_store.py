@@ -0,0 +1,537 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+# --- Mapeamento Simulado (Ramo -> Área de Estudo) ---
+RAMO_TO_AREA_MAP = {
+    'Direito Constitucional': 'Direito Público',
+    'Direito Administrativo': 'Direito Público',
+    'Direito Tributário': 'Direito Público',
+    'Direito Financeiro': 'Direito Público',
+    'Direito Eleitoral': 'Direito Público',
+    'Direito Ambiental': 'Direito Público',
+    'Direito Urbanístico': 'Direito Público',
+    'Direito Penal': 'Direito Penal',
+    'Direito Processual Penal': 'Direito Penal',
+    'Direito Civil': 'Direito Privado',
+    'Direito Empresarial': 'Direito Privado',
+    'Direito Comercial': 'Direito Privado',
+    'Direito do Consumidor': 'Direito Privado',
+    'Direito Processual Civil': 'Direito Processual',
+    'Direito do Trabalho': 'Direito Social / Trabalho',
+    'Direito Processual do Trabalho': 'Direito Social / Trabalho',
+    'Direito Previdenciário': 'Direito Social / Previdenciário',
+    'Direito Internacional Público': 'Direito Internacional',
+    'Direito Internacional Privado': 'Direito Internacional',
+}
+DEFAULT_AREA = 'Outras Áreas'
+
+# --- Snapshot em Disco ---
+SNAPSHOT_DIR = ".informativos_cache"
+SNAPSHOT_FORMAT = 4  # Bump whenever process_dataframe changes its output
+HASH_CHUNK_SIZE = 1 << 20
+
+
+# --- Processamento (Excel -> DataFrame) ---
+def process_dataframe(df):
+    # Rename columns based on the new Excel structure
+    rename_map = {
+        'Numero do informativo': 'numero_informativo',
+        'Classe Processo': 'classe_processo',
+        'Data Julgamento': 'data_julgamento', # Assuming this column exists
+        'Tese Julgado': 'tese_julgamento', # This seems to be the 'Notícia Completa'
+        'Ramo Direito': 'ramo_direito',
+        'Repercussão Geral': 'repercussao_geral',
+        'Título': 'Título', # Keep original 'Título'
+        'Resumo': 'Resumo', # Keep original 'Resumo'
+        'Legislação': 'Legislação' # Keep original 'Legislação'
+        # Add other columns if needed
+    }
+    # Select only columns that exist in the Excel file before renaming
+    existing_cols_map = {k: v for k, v in rename_map.items() if k in df.columns}
+    df.rename(columns=existing_cols_map, inplace=True)
+    print(f"Colunas após renomear: {df.columns.tolist()}")
+
+    # Ensure essential columns exist, fill with default if not
+    essential_cols = ['Título', 'tese_julgamento', 'ramo_direito', 'classe_processo', 'Resumo', 'Legislação', 'numero_informativo', 'repercussao_geral']
+    for col in essential_cols:
+        if col not in df.columns:
+            df[col] = ''
+            print(f"Aviso: Coluna '{col}' não encontrada no Excel, criada vazia.")
+
+    # Process 'Data Julgamento'
+    if 'data_julgamento' in df.columns:
+        df['data_julgamento'] = pd.to_datetime(df['data_julgamento'], errors='coerce') # Let pandas infer format or specify if needed
+        df['ano_julgamento'] = df['data_julgamento'].dt.year
+        df['mes_julgamento'] = df['data_julgamento'].dt.month
+        df['ano_mes_julgamento'] = df['data_julgamento'].dt.strftime('%Y-%m')
+    else:
+        # If no date column, create placeholders
+        print("Aviso: Coluna 'data_julgamento' não encontrada. Datas não serão processadas.")
+        df['data_julgamento'] = pd.NaT
+        df['ano_julgamento'] = None
+        df['mes_julgamento'] = None
+        df['ano_mes_julgamento'] = None
+
+    # Fill NaNs in text columns
+    text_cols = ['Título', 'tese_julgamento', 'ramo_direito', 'classe_processo', 'Resumo', 'Legislação']
+    for col in text_cols:
+        if col in df.columns:
+            df[col] = df[col].fillna('')
+
+    # Process 'numero_informativo'
+    if 'numero_informativo' in df.columns:
+         df['numero_informativo'] = pd.to_numeric(df['numero_informativo'], errors='coerce')
+         # Keep rows even if numero_informativo is NaN for now, maybe filter later
+         # df.dropna(subset=['numero_informativo'], inplace=True)
+         df['numero_informativo'] = df['numero_informativo'].astype('Int64').astype(str).replace('<NA>', '') # Handle potential NaNs after conversion
+
+    # Process 'repercussao_geral'
+    if 'repercussao_geral' in df.columns:
+        df['repercussao_geral'] = df['repercussao_geral'].fillna('Não Informado')
+        df['repercussao_geral'] = df['repercussao_geral'].replace({'Sim': 'Sim', 'Não': 'Não'}, regex=False)
+        df.loc[~df['repercussao_geral'].isin(['Sim', 'Não']), 'repercussao_geral'] = 'Não Informado'
+    else:
+        df['repercussao_geral'] = 'Não Informado'
+
+    # Add unique ID (derived from informativo + título, so it survives a replaced or reordered spreadsheet)
+    if 'id' not in df.columns:
+        df['id'] = stable_ids(df['numero_informativo'], df['Título'])
+    df['id'] = df['id'].astype(str)
+
+    # Process 'Ramo Direito' (Split into a list per julgado; the link table holds one row per ramo)
+    df['ramo_direito'] = df['ramo_direito'].astype(str).str.split(';').apply(lambda x: [item.strip() for item in x if item.strip()])
+
+    julgados, ramos = normalize(df)
+    print(f"Colunas finais: {julgados.columns.tolist()} + vínculos {ramos.columns.tolist()}")
+    print(f"Número de julgados: {len(julgados)} | vínculos julgado/ramo: {len(ramos)}")
+
+    return julgados, ramos
+
+
+def stable_ids(numeros, titulos):
+    # Favorites, metas and reading progress are saved by id; a row-position id would move them onto
+    # other julgados when the spreadsheet is replaced. Repeated (informativo, título) pairs get -2, -3...
+    ids, seen = [], {}
+    for numero, titulo in zip(numeros.astype(str), titulos.astype(str)):
+        base = hashlib.sha1(f"{numero}|{titulo.strip()}".encode()).hexdigest()[:12]
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return ids
+
+
+# --- Armazenamento Normalizado (julgados únicos + vínculos ramo/área) ---
+CATEGORICAL_COLS = ['classe_processo', 'numero_informativo', 'repercussao_geral', 'ano_mes_julgamento']
+
+
+def normalize(df):
+    # One row per julgado (row position == integer code used by the link table)
+    df = df.reset_index(drop=True)
+    ramo_lists = df.pop('ramo_direito')
+
+    # Julgados without ramo keep a link with NaN ramo so they still fall under DEFAULT_AREA
+    exploded = ramo_lists.explode()
+    ramos = pd.DataFrame({
+        'row': exploded.index.to_numpy(dtype=np.int32),
+        'ramo_direito': exploded.to_numpy(dtype=object),
+    }).drop_duplicates().reset_index(drop=True)
+    ramos['area_estudo'] = ramos['ramo_direito'].map(RAMO_TO_AREA_MAP).fillna(DEFAULT_AREA)
+    return _encode(df, ramos)
+
+
+def _encode(julgados, ramos):
+    # Categorical codes for the filter columns; shared by normalize and the batch merge
+    for col in CATEGORICAL_COLS:
+        if col in julgados.columns:
+            julgados[col] = julgados[col].astype(object).astype('category')
+    for col, dtype in (('ano_julgamento', 'Int16'), ('mes_julgamento', 'Int8')):
+        if col in julgados.columns:
+            julgados[col] = pd.to_numeric(julgados[col], errors='coerce').astype(dtype)
+    for col in ('ramo_direito', 'area_estudo'):
+        ramos[col] = ramos[col].astype(object).astype('category')
+    ramos['row'] = ramos['row'].astype(np.int32)
+    return julgados, ramos
+
+
+# --- Ingestão Incremental (upsert por numero_informativo + id) ---
+def read_source(path):
+    # Excel is the normal input; CSV/Parquet are accepted for batches and large generated corpora
+    lowered = path.lower()
+    if lowered.endswith('.csv'):
+        return pd.read_csv(path)
+    if lowered.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+def _resolve_batch_ids(julgados, batch):
+    # Batches without an 'id' column reuse the id of the same (informativo, título). New julgados get the next
+    # number when the spreadsheet has numeric ids, else their stable id (already set by process_dataframe)
+    known = dict(zip(zip(julgados['numero_informativo'].astype(str), julgados['Título'].astype(str)), julgados['id']))
+    numeric_ids = pd.to_numeric(julgados['id'], errors='coerce')
+    sequential = len(julgados) > 0 and numeric_ids.notna().all()
+    next_id = int(numeric_ids.max()) + 1 if sequential else None
+    used = set(julgados['id'])
+    ids = []
+    for key, candidate in zip(zip(batch['numero_informativo'].astype(str), batch['Título'].astype(str)), batch['id']):
+        if key not in known:
+            if sequential:
+                candidate = str(next_id)
+                next_id += 1
+            while candidate in used: # Same hash as an existing (different) julgado's suffixed id
+                candidate = f"{candidate}-b"
+            known[key] = candidate
+            used.add(candidate)
+        ids.append(known[key])
+    return ids
+
+
+def merge_batch(julgados, ramos, batch_julgados, batch_ramos, batch_has_ids=True):
+    # Upsert keyed by (numero_informativo, id): replaced julgados keep their row code, new ones are appended
+    batch_julgados = batch_julgados.copy()
+    if not batch_has_ids:
+        batch_julgados['id'] = _resolve_batch_ids(julgados, batch_julgados)
+    batch_keys = list(zip(batch_julgados['numero_informativo'].astype(str), batch_julgados['id']))
+    latest = ~pd.Series(batch_keys).duplicated(keep='last').to_numpy() # Repeated keys: last row wins
+
+    row_of_key = {key: row for row, key in enumerate(zip(julgados['numero_informativo'].astype(str), julgados['id']))}
+    used_ids = set(julgados['id'])
+    target_rows = {} # batch row -> merged row
+    n_rows = len(julgados)
+    for batch_row in np.flatnonzero(latest):
+        key = batch_keys[batch_row]
+        if key in row_of_key:
+            target_rows[batch_row] = row_of_key[key]
+            continue
+        if key[1] in used_ids:
+            new_id = f"{key[0]}-{key[1]}"
+            print(f"Aviso: id {key[1]} já usado por outro informativo; julgado do Inf. {key[0]} recebe o id {new_id}.")
+            batch_julgados.at[batch_row, 'id'] = new_id
+            key = (key[0], new_id)
+        row_of_key[key] = n_rows
+        used_ids.add(key[1])
+        target_rows[batch_row] = n_rows
+        n_rows += 1
+
+    batch_rows = np.fromiter(target_rows.keys(), dtype=np.int64, count=len(target_rows))
+    targets = np.fromiter(target_rows.values(), dtype=np.int64, count=len(target_rows))
+    merged = julgados.astype({col: object for col in CATEGORICAL_COLS if col in julgados.columns})
+    merged = merged.reindex(range(n_rows))
+    for col in merged.columns:
+        if col in batch_julgados.columns:
+            merged.loc[targets, col] = batch_julgados[col].astype(object).to_numpy()[batch_rows]
+
+    changed_rows = np.sort(targets).astype(np.int32)
+    kept_links = ramos[~np.isin(ramos['row'].to_numpy(), changed_rows)]
+    new_links = batch_ramos[np.isin(batch_ramos['row'].to_numpy(), batch_rows)].copy()
+    new_links['row'] = new_links['row'].map(target_rows)
+    link_cols = {'ramo_direito': object, 'area_estudo': object}
+    merged_links = pd.concat([kept_links.astype(link_cols), new_links.astype(link_cols)], ignore_index=True)
+    merged_links = merged_links.sort_values('row', kind='stable').reset_index(drop=True)
+    merged, merged_links = _encode(merged, merged_links)
+    return merged, merged_links, changed_rows
+
+
+class Dataset:
+    def __init__(self, julgados, ramos, version, paths=None):
+        self.julgados = julgados
+        self.ramos = ramos
+        self.version = version
+        self.paths = paths or {} # Snapshot artifacts (derived indexes are stored next to the tables)
+        self._build_lookup()
+
+    def __len__(self):
+        return len(self.julgados)
+
+    # --- Acesso por id em O(1) ---
+    def _build_lookup(self):
+        # id -> row code, plus each julgado's ramos/áreas already aggregated (built once per load)
+        self.row_of_id = dict(zip(self.julgados['id'].tolist(), range(len(self.julgados))))
+        link_rows = self.ramos['row'].to_numpy()
+        order = np.argsort(link_rows, kind='stable')
+        bounds = np.searchsorted(link_rows[order], np.arange(len(self.julgados) + 1))
+        ramo_values = self.ramos['ramo_direito'].astype(object).to_numpy()[order]
+        area_values = self.ramos['area_estudo'].astype(object).to_numpy()[order]
+        self.ramos_by_row = []
+        self.areas_by_row = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            self.ramos_by_row.append(tuple(r for r in ramo_values[start:end] if pd.notna(r)))
+            self.areas_by_row.append(tuple(dict.fromkeys(area_values[start:end])))
+
+    def record_at(self, row):
+        record = self.julgados.iloc[row].to_dict()
+        record['row'] = int(row)
+        record['ramos'] = self.ramos_by_row[row]
+        record['areas'] = self.areas_by_row[row]
+        return record
+
+    def record(self, julgado_id):
+        row = self.row_of_id.get(julgado_id)
+        return None if row is None else self.record_at(row)
+
+    def rows_of_ids(self, julgado_ids):
+        return np.array(sorted(self.row_of_id[i] for i in julgado_ids if i in self.row_of_id), dtype=np.int32)
+
+    def aggregate_ramos(self, rows):
+        # Comma-joined ramos/áreas for the given julgado rows, aligned with `rows`
+        return ([', '.join(self.ramos_by_row[r]) for r in rows],
+                [', '.join(self.areas_by_row[r]) for r in rows])
+
+
+# --- Snapshot (Arrow IPC, mapeável em memória) ---
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_paths(excel_path, snapshot_dir=SNAPSHOT_DIR, version=None):
+    # Data artifacts carry the version in their name, so a new version never overwrites files in use
+    base = os.path.join(snapshot_dir, os.path.splitext(os.path.basename(excel_path))[0])
+    paths = {
+        'manifest': f"{base}.manifest.json",
+        'batches': f"{base}.batches",
+    }
+    if version is not None:
+        paths.update({
+            'julgados': f"{base}.{version}.julgados.arrow",
+            'ramos': f"{base}.{version}.ramos.arrow",
+            'search': f"{base}.{version}.search.npz",
+            'related': f"{base}.{version}.related.npz",
+        })
+    return paths
+
+
+def _snapshot_version(base_sha256, batches):
+    if not batches:
+        return base_sha256[:16]
+    digest = hashlib.sha256(base_sha256.encode())
+    for batch in batches:
+        digest.update(batch['sha256'].encode())
+    return digest.hexdigest()[:16]
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def temp_path(path, suffix=''):
+    # Unique per writer: replicas building the same snapshot never write into each other's temp file
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp{suffix}"
+
+
+@contextmanager
+def snapshot_lock(snapshot_dir=SNAPSHOT_DIR):
+    # Serializes builds/ingestions across processes (POSIX only; elsewhere the unique temp names still apply)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = temp_path(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _write_table_atomic(path, df):
+    tmp_path = temp_path(path)
+    # Uncompressed so the file can be memory-mapped on read
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def _read_table(path):
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+def _publish(excel_path, snapshot_dir, julgados, ramos, manifest, previous_version=None, derive=None):
+    # Tables first, then the derived indexes (`derive`, from ingest.py), manifest last:
+    # readers only see a version once all of its files exist
+    paths = snapshot_paths(excel_path, snapshot_dir, manifest['version'])
+    _write_table_atomic(paths['julgados'], julgados)
+    _write_table_atomic(paths['ramos'], ramos)
+    dataset = Dataset(julgados, ramos, manifest['version'], paths)
+    if derive is not None:
+        derive(dataset)
+    _write_json_atomic(paths['manifest'], manifest)
+    _remove_stale_versions(excel_path, snapshot_dir, {manifest['version'], previous_version})
+    return dataset
+
+
+def _remove_stale_versions(excel_path, snapshot_dir, keep_versions):
+    # The previous version is kept so processes still reading it are not disturbed
+    prefix = os.path.splitext(os.path.basename(excel_path))[0] + '.'
+    for name in os.listdir(snapshot_dir):
+        if not name.startswith(prefix):
+            continue
+        parts = name[len(prefix):].split('.')
+        if len(parts) >= 3 and len(parts[0]) == 16 and parts[0] not in keep_versions:
+            os.remove(os.path.join(snapshot_dir, name))
+
+
+def snapshot_is_fresh(excel_path, snapshot_dir=SNAPSHOT_DIR):
+    # Cheap check first (mtime + size); only hash the file when those changed
+    manifest = _read_manifest(snapshot_paths(excel_path, snapshot_dir)['manifest'])
+    if manifest is None or manifest.get('format') != SNAPSHOT_FORMAT:
+        return None
+    paths = snapshot_paths(excel_path, snapshot_dir, manifest['version'])
+    if not (os.path.exists(paths['julgados']) and os.path.exists(paths['ramos'])):
+        return None
+    stat = os.stat(excel_path)
+    if manifest['mtime_ns'] == stat.st_mtime_ns and manifest['size'] == stat.st_size:
+        return manifest
+    if manifest['sha256'] != file_sha256(excel_path):
+        return None
+    # Same content, only touched: remember the new mtime so the next start skips hashing
+    manifest['mtime_ns'] = stat.st_mtime_ns
+    manifest['size'] = stat.st_size
+    _write_json_atomic(paths['manifest'], manifest)
+    return manifest
+
+
+def _apply_batch_file(julgados, ramos, batch_path):
+    raw = read_source(batch_path)
+    print(f"Lote {batch_path}: {len(raw)} linhas")
+    batch_has_ids = 'id' in raw.columns
+    batch_julgados, batch_ramos = process_dataframe(raw)
+    return merge_batch(julgados, ramos, batch_julgados, batch_ramos, batch_has_ids)
+
+
+def build_snapshot(excel_path, snapshot_dir=SNAPSHOT_DIR, derive=None):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    paths = snapshot_paths(excel_path, snapshot_dir)
+    previous = _read_manifest(paths['manifest']) or {}
+    stat = os.stat(excel_path)
+    sha256 = file_sha256(excel_path)
+
+    df = read_source(excel_path)
+    print(f"Colunas lidas do Excel: {df.columns.tolist()}")
+    julgados, ramos = process_dataframe(df)
+
+    # Batches ingested on top of the previous spreadsheet are replayed (upserts are idempotent)
+    batches = []
+    for batch in previous.get('batches', []):
+        batch_path = os.path.join(paths['batches'], batch['file'])
+        if not os.path.exists(batch_path):
+            print(f"Aviso: lote {batch['file']} não encontrado; ignorado.")
+            continue
+        julgados, ramos, _ = _apply_batch_file(julgados, ramos, batch_path)
+        batches.append(batch)
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'source': os.path.abspath(excel_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': sha256,
+        'batches': batches,
+        'version': _snapshot_version(sha256, batches),
+    }
+    # Processes still on the previous version keep reading its files until their next rerun
+    dataset = _publish(excel_path, snapshot_dir, julgados, ramos, manifest, previous_version=previous.get('version'),
+                       derive=derive)
+    print(f"Snapshot gravado em {snapshot_dir} (versão {manifest['version']})")
+    return dataset, manifest
+
+
+def _read_snapshot(excel_path, snapshot_dir, manifest):
+    paths = snapshot_paths(excel_path, snapshot_dir, manifest['version'])
+    try:
+        julgados = _read_table(paths['julgados'])
+        ramos = _read_table(paths['ramos'])
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Aviso: Snapshot ilegível ({e}). Reprocessando o Excel...")
+        return None
+    print(f"Snapshot carregado de {snapshot_dir} (versão {manifest['version']}, {len(julgados)} julgados, {len(ramos)} vínculos)")
+    return Dataset(julgados, ramos, manifest['version'], paths), manifest
+
+
+def _load_or_build_locked(excel_path, snapshot_dir, derive=None):
+    # Caller holds snapshot_lock; another replica may have built the snapshot while we waited for it
+    manifest = snapshot_is_fresh(excel_path, snapshot_dir)
+    loaded = _read_snapshot(excel_path, snapshot_dir, manifest) if manifest is not None else None
+    if loaded is None:
+        print(f"Snapshot ausente ou desatualizado para {excel_path}. Processando o Excel...")
+        return build_snapshot(excel_path, snapshot_dir, derive)
+    return loaded
+
+
+def load_snapshot(excel_path, snapshot_dir=SNAPSHOT_DIR, derive=None):
+    manifest = snapshot_is_fresh(excel_path, snapshot_dir)
+    loaded = _read_snapshot(excel_path, snapshot_dir, manifest) if manifest is not None else None
+    if loaded is None: # Only builders wait on the lock; readers of a fresh snapshot never take it
+        with snapshot_lock(snapshot_dir):
+            return _load_or_build_locked(excel_path, snapshot_dir, derive)
+    return loaded
+
+
+def snapshot_token(excel_path, snapshot_dir=SNAPSHOT_DIR):
+    # Changes when the spreadsheet is replaced or a batch is ingested; keys the in-process cache
+    token = []
+    for path in (excel_path, snapshot_paths(excel_path, snapshot_dir)['manifest']):
+        try:
+            token.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            token.append(None)
+    return tuple(token)
+
+
+def ingest_batch(excel_path, batch_path, snapshot_dir=SNAPSHOT_DIR, derive=None):
+    # Upserts a new spreadsheet/CSV batch into the current snapshot and publishes a new version.
+    # derive(dataset, changed_rows=None, previous=None) writes a version's indexes before it becomes visible
+    # Under the lock for the whole merge: concurrent ingestions (or an app replica rebuilding) publish one at a time
+    with snapshot_lock(snapshot_dir):
+        dataset, manifest = _load_or_build_locked(excel_path, snapshot_dir, derive)
+        batch_sha256 = file_sha256(batch_path)
+        batches = manifest.get('batches', [])
+        if any(batch['sha256'] == batch_sha256 for batch in batches):
+            print(f"Lote {batch_path} já foi ingerido (versão {manifest['version']}).")
+            return dataset, manifest, np.empty(0, dtype=np.int32)
+
+        paths = snapshot_paths(excel_path, snapshot_dir)
+        os.makedirs(paths['batches'], exist_ok=True)
+        stored_name = f"{len(batches) + 1:04d}_{os.path.basename(batch_path)}"
+        shutil.copyfile(batch_path, os.path.join(paths['batches'], stored_name))
+
+        julgados, ramos, changed_rows = _apply_batch_file(dataset.julgados, dataset.ramos, batch_path)
+        batches = batches + [{
+            'file': stored_name,
+            'sha256': batch_sha256,
+            'ingested_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': int(len(changed_rows)),
+        }]
+        new_manifest = dict(manifest, batches=batches, version=_snapshot_version(manifest['sha256'], batches),
+                            previous_version=manifest['version'])
+        derive_new = None if derive is None else (lambda built: derive(built, changed_rows, dataset))
+        new_dataset = _publish(excel_path, snapshot_dir, julgados, ramos, new_manifest, previous_version=manifest['version'],
+                               derive=derive_new)
+        print(f"Lote ingerido: {len(changed_rows)} julgados inseridos/atualizados (versão {manifest['version']} -> {new_manifest['version']})")
+        return new_dataset, new_manifest, changed_rows
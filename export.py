@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from data_store import SNAPSHOT_DIR
+
+# --- Exportação da Seleção (CSV / XLSX / Parquet) ---
+# Files are written CHUNK_ROWS julgados at a time, so memory stays flat even for the full corpus.
+# Finished files are kept on disk, named by data version + the exported row codes: the same selection
+# (same filters, search and order) is served again without rewriting it.
+# With Streamlit's static serving on, files go to static/exports and the browser downloads them straight
+# from disk; otherwise they pass through st.download_button, which holds the whole file in memory, so
+# only files up to MAX_DOWNLOAD_BYTES are offered that way.
+EXPORT_DIR = os.environ.get('INFORMATIVOS_EXPORT_DIR', os.path.join(SNAPSHOT_DIR, 'exports'))
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static') # Served by Streamlit at app/static/
+STATIC_EXPORT_DIR = os.path.join(STATIC_DIR, 'exports')
+MAX_CACHE_BYTES = int(os.environ.get('INFORMATIVOS_EXPORT_CACHE_MB', 512)) * 1024 * 1024
+MAX_DOWNLOAD_BYTES = int(os.environ.get('INFORMATIVOS_EXPORT_MAX_MB', 50)) * 1024 * 1024
+MAX_STATIC_BYTES = 200 * 1024 * 1024 # Streamlit answers 404 for larger static files
+CHUNK_ROWS = 5000
+EXPORT_COLUMNS = {
+    'id': 'ID',
+    'numero_informativo': 'Informativo',
+    'data_julgamento': 'Data',
+    'Título': 'Título',
+    'classe_processo': 'Classe',
+    'ramo_direito': 'Ramo Direito',
+    'area_estudo': 'Área Estudo',
+    'repercussao_geral': 'RG',
+    'tese_julgamento': 'Tese',
+    'Resumo': 'Resumo',
+    'Legislação': 'Legislação',
+}
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+XLSX_MAX_CELL = 32767 # Excel's limit per cell; longer texts are cut
+
+_lock = threading.Lock() # Guards the cache pruning; writers never share a temp file
+
+
+def _chunks(dataset, rows):
+    # One DataFrame per CHUNK_ROWS julgados, ramos/áreas re-aggregated per julgado
+    columns = [col for col in EXPORT_COLUMNS if col in dataset.julgados.columns]
+    for start in range(0, max(len(rows), 1), CHUNK_ROWS): # An empty selection still yields the header
+        chunk_rows = rows[start:start + CHUNK_ROWS]
+        df = dataset.julgados[columns].iloc[chunk_rows].reset_index(drop=True)
+        df['ramo_direito'], df['area_estudo'] = dataset.aggregate_ramos(chunk_rows)
+        for col in df.columns:
+            if col != 'data_julgamento': # Same column types in every chunk (Parquet needs one schema)
+                df[col] = df[col].astype('string')
+        yield df[[col for col in EXPORT_COLUMNS if col in df.columns]].rename(columns=EXPORT_COLUMNS)
+
+
+def _write_csv(chunks, path):
+    # ';' and a BOM so Excel in pt-BR opens it with accents and columns right
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        for i, df in enumerate(chunks):
+            df.to_csv(f, sep=';', header=i == 0, index=False, date_format='%d/%m/%Y')
+
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    def cell(value):
+        if pd.isna(value):
+            return None
+        if isinstance(value, pd.Timestamp):
+            return value.date()
+        return ILLEGAL_CHARACTERS_RE.sub('', str(value))[:XLSX_MAX_CELL]
+
+    workbook = Workbook(write_only=True) # Rows go straight to the zip stream instead of an in-memory sheet
+    sheet = workbook.create_sheet("Julgados")
+    header = False
+    for df in chunks:
+        if not header:
+            sheet.append(list(df.columns))
+            header = True
+        for values in df.itertuples(index=False, name=None):
+            sheet.append([cell(v) for v in values])
+    workbook.save(path)
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df, preserve_index=False, schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table) # One row group per chunk
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {'CSV': _write_csv, 'XLSX': _write_xlsx, 'Parquet': _write_parquet}
+
+
+def export_path(dataset, rows, fmt, directory=EXPORT_DIR):
+    rows = pd.unique(np.asarray(rows, dtype=np.int32)) # One line per julgado, in the order shown
+    digest = hashlib.sha256(rows.tobytes()).hexdigest()[:24]
+    return os.path.join(directory, f"{dataset.version}.{digest}.{FORMATS[fmt][0]}")
+
+
+def cached_export(dataset, rows, fmt, directory=EXPORT_DIR):
+    # -> path of an already written file for this selection, or None
+    path = export_path(dataset, rows, fmt, directory)
+    try:
+        os.utime(path) # Recently served files are pruned last
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def export_file(dataset, rows, fmt, directory=EXPORT_DIR):
+    # -> path of the finished file; reused as long as the data version and the selection match
+    path = cached_export(dataset, rows, fmt, directory)
+    if path is not None:
+        return path
+    rows = pd.unique(np.asarray(rows, dtype=np.int32))
+    path = export_path(dataset, rows, fmt, directory)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        WRITERS[fmt](_chunks(dataset, rows), tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    prune_cache(directory=directory, keep=path)
+    return path
+
+
+def static_url(path):
+    # Relative URL of a file under STATIC_DIR (needs server.enableStaticServing)
+    return 'app/static/' + os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+
+
+def prune_cache(max_bytes=MAX_CACHE_BYTES, keep=None, directory=EXPORT_DIR):
+    # Oldest (least recently served) exports go first once the directory exceeds max_bytes; `keep` is about to be served
+    with _lock:
+        try:
+            entries = [entry for entry in os.scandir(directory) if entry.is_file() and not entry.name.endswith('.tmp')]
+        except FileNotFoundError:
+            return 0
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        total, removed = 0, 0
+        for entry in entries:
+            total += entry.stat().st_size
+            if total > max_bytes and entry.path != keep:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
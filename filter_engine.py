@@ -0,0 +1,159 @@
+import numpy as np
+
+# --- Facetas da Barra Lateral ---
+JULGADO_FACETS = ['ano_julgamento', 'ano_mes_julgamento', 'classe_processo', 'numero_informativo', 'repercussao_geral']
+LINK_FACETS = ['area_estudo', 'ramo_direito'] # Resolved through the ramo/área link table
+EMPTY_ROWS = np.empty(0, dtype=np.int32)
+
+
+def _codes_and_values(series):
+    # Integer code per row (-1 = missing) plus the value behind each code
+    if hasattr(series, 'cat'):
+        return series.cat.codes.to_numpy(dtype=np.int32), list(series.cat.categories)
+    valid = series.notna().to_numpy()
+    present = series[valid].to_numpy()
+    values = np.unique(present)
+    codes = np.full(len(series), -1, dtype=np.int32)
+    codes[valid] = np.searchsorted(values, present)
+    return codes, values.tolist()
+
+
+def _postings(codes, keys, n_values):
+    # Sorted row arrays per code; a stable argsort keeps each list in ascending row order
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+    return [keys[order[bounds[i]:bounds[i + 1]]].astype(np.int32) for i in range(n_values)]
+
+
+def union(arrays):
+    arrays = [a for a in arrays if len(a)]
+    if not arrays:
+        return EMPTY_ROWS
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.unique(np.concatenate(arrays))
+
+
+def intersect(arrays):
+    if not arrays:
+        return None
+    arrays = sorted(arrays, key=len) # Smallest first keeps every step cheap
+    result = arrays[0]
+    for other in arrays[1:]:
+        if not len(result):
+            break
+        result = np.intersect1d(result, other, assume_unique=True)
+    return result
+
+
+class FilterEngine:
+    def __init__(self, dataset):
+        julgados, ramos = dataset.julgados, dataset.ramos
+        self.n_rows = len(julgados)
+        self.version = dataset.version
+        self.codes = {}
+        self.values = {}
+        self.code_of = {}
+        self.postings = {}
+        all_rows = np.arange(self.n_rows, dtype=np.int32)
+        for facet in JULGADO_FACETS:
+            if facet not in julgados.columns:
+                continue
+            codes, values = _codes_and_values(julgados[facet])
+            self._register(facet, codes, values, _postings(codes, all_rows, len(values)))
+
+        # Link facets: postings hold unique julgado rows per ramo / área
+        self.link_rows = ramos['row'].to_numpy(dtype=np.int32)
+        for facet in LINK_FACETS:
+            codes, values = _codes_and_values(ramos[facet])
+            postings = [np.unique(p) for p in _postings(codes, self.link_rows, len(values))]
+            self._register(facet, codes, values, postings)
+
+        # Área is a function of ramo, so a ramo+área selection can be answered with ramo postings only
+        ramo_codes, area_codes = self.codes['ramo_direito'], self.codes['area_estudo']
+        has_ramo = ramo_codes >= 0
+        self.area_of_ramo = dict(zip(ramo_codes[has_ramo].tolist(), area_codes[has_ramo].tolist()))
+
+    def _register(self, facet, codes, values, postings):
+        self.codes[facet] = codes
+        self.values[facet] = values
+        self.code_of[facet] = {value: code for code, value in enumerate(values)}
+        self.postings[facet] = postings
+
+    def _value_codes(self, facet, selected):
+        lookup = self.code_of.get(facet, {})
+        return [lookup[v] for v in selected if v in lookup]
+
+    # --- Seleção por interseção/união de listas ---
+    def _facet_rows(self, facet, selected):
+        return union([self.postings[facet][code] for code in self._value_codes(facet, selected)])
+
+    def _link_rows(self, selections):
+        areas = selections.get('area_estudo')
+        ramos = selections.get('ramo_direito')
+        if ramos:
+            ramo_codes = self._value_codes('ramo_direito', ramos)
+            if areas:
+                area_codes = set(self._value_codes('area_estudo', areas))
+                ramo_codes = [c for c in ramo_codes if self.area_of_ramo.get(c) in area_codes]
+            return union([self.postings['ramo_direito'][c] for c in ramo_codes])
+        if areas:
+            return self._facet_rows('area_estudo', areas)
+        return None
+
+    def _candidate_lists(self, selections):
+        lists = [self._facet_rows(facet, selected) for facet, selected in selections.items()
+                 if selected and facet in self.postings and facet not in LINK_FACETS]
+        link_rows = self._link_rows(selections)
+        if link_rows is not None:
+            lists.append(link_rows)
+        return lists
+
+    def select(self, selections, restrict=None):
+        # selections: {facet: [values]}; empty lists mean "no filter". Returns sorted row codes.
+        lists = self._candidate_lists(selections)
+        if restrict is not None:
+            lists.append(np.asarray(restrict, dtype=np.int32))
+        result = intersect(lists)
+        return np.arange(self.n_rows, dtype=np.int32) if result is None else result
+
+    # --- Contagens por faceta (quantos resultados cada opção retornaria) ---
+    def _member(self, rows):
+        member = np.zeros(self.n_rows, dtype=bool)
+        member[rows] = True
+        return member
+
+    def facet_counts(self, selections, restrict=None):
+        # Each facet is counted against the selection of all *other* facets
+        counts = {}
+        for facet in JULGADO_FACETS:
+            if facet not in self.postings:
+                continue
+            rows = self.select({f: v for f, v in selections.items() if f != facet}, restrict)
+            codes = self.codes[facet][rows]
+            bins = np.bincount(codes[codes >= 0], minlength=len(self.values[facet]))
+            counts[facet] = dict(zip(self.values[facet], bins.tolist()))
+
+        base = self.select({f: v for f, v in selections.items() if f not in LINK_FACETS}, restrict)
+        link_ok = self._member(base)[self.link_rows]
+        for facet, other in (('area_estudo', 'ramo_direito'), ('ramo_direito', 'area_estudo')):
+            mask = link_ok.copy()
+            if selections.get(other):
+                mask &= np.isin(self.codes[other], self._value_codes(other, selections[other]))
+            codes = self.codes[facet][mask]
+            rows = self.link_rows[mask]
+            valid = codes >= 0
+            n_values = max(len(self.values[facet]), 1)
+            # A julgado with two ramos in the same área must count once
+            pairs = np.unique(rows[valid].astype(np.int64) * n_values + codes[valid])
+            bins = np.bincount(pairs % n_values, minlength=len(self.values[facet]))
+            counts[facet] = dict(zip(self.values[facet], bins.tolist()))
+        return counts
+
+    def count_links(self, rows, selections):
+        # Number of julgado/ramo links behind `rows` that match the ramo/área selection
+        mask = self._member(rows)[self.link_rows]
+        for facet in LINK_FACETS:
+            if selections.get(facet):
+                mask &= np.isin(self.codes[facet], self._value_codes(facet, selections[facet]))
+        return int(mask.sum())
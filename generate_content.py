@@ -0,0 +1,175 @@
+import argparse
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import data_store
+from content_store import ContentStore, content_hash
+
+# --- Geração Offline de Assertivas e Casos Práticos ---
+# Uso: python generate_content.py [--excel Dados_InformativosSTF.xlsx] [--workers 4]
+# Percorre todos os julgados do snapshot, gera o conteúdo por regras/modelos (sem serviço externo)
+# em um pool de processos e grava cada lote concluído no banco de conteúdo. Julgados cujo hash não
+# mudou são pulados, então uma execução interrompida continua de onde parou.
+
+CHUNK_SIZE = 200 # Julgados per task; each finished task is one committed checkpoint
+MAX_ASSERTIVAS = 4
+MIN_SENTENCE_CHARS = 40
+SENTENCE_RE = re.compile(r'(?<=[.;!?])\s+(?=[A-ZÁÉÍÓÚÂÊÔÃÕÇ])')
+# Turning a true statement into a false one: first rule that matches wins (word-bounded, case kept)
+NEGATION_RULES = [
+    (r'\binconstitucional\b', 'constitucional'),
+    (r'\bconstitucional\b', 'inconstitucional'),
+    (r'\binconstitucionalidade\b', 'constitucionalidade'),
+    (r'\bconstitucionalidade\b', 'inconstitucionalidade'),
+    (r'\bé vedad([oa])\b', r'é permitid\1'),
+    (r'\bé permitid([oa])\b', r'é vedad\1'),
+    (r'\bilegítim([oa])\b', r'legítim\1'),
+    (r'\blegítim([oa])\b', r'ilegítim\1'),
+    (r'\binválid([oa])\b', r'válid\1'),
+    (r'\bválid([oa])\b', r'inválid\1'),
+    (r'\bimpossível\b', 'possível'),
+    (r'\bpossível\b', 'impossível'),
+    (r'\bobrigatóri([oa])\b', r'facultativ\1'),
+    (r'\bfacultativ([oa])\b', r'obrigatóri\1'),
+    (r'\bnão (pode|podem|deve|devem|é|são|compete|cabe|há|incide|incidem)\b', r'\1'),
+    (r'\b(pode|podem|deve|devem|compete|cabe|incide|incidem)\b', r'não \1'),
+    (r'\b(é|são)\b', r'não \1'),
+]
+CASE_TEMPLATES = {
+    'Direito Tributário': ("A empresa {empresa} foi autuada pelo Fisco {ente} e questiona judicialmente a cobrança.",
+                           "a exigência tributária"),
+    'Direito Penal': ("{pessoa} responde a processo criminal e sua defesa impetrou {classe} perante o STF.",
+                      "a situação processual de {pessoa}"),
+    'Direito Processual Penal': ("{pessoa} teve medida restritiva decretada e sua defesa levou a questão ao STF por meio de {classe}.",
+                                 "a medida imposta a {pessoa}"),
+    'Direito Administrativo': ("{pessoa}, servidor(a) público(a) {ente_adj}, discute com a Administração um ato que afetou sua situação funcional.",
+                               "o ato administrativo questionado"),
+    'Direito Previdenciário': ("{pessoa} requereu benefício previdenciário, que foi negado, e a controvérsia chegou ao STF.",
+                               "o pedido de {pessoa}"),
+    'Direito Constitucional': ("O partido {partido} ajuizou {classe} contestando uma norma {ente_adj} recém-editada.",
+                               "a validade da norma impugnada"),
+}
+DEFAULT_CASE_TEMPLATE = ("{pessoa} ajuizou ação discutindo tema semelhante ao apreciado pelo STF, e o caso chegou ao Tribunal por meio de {classe}.",
+                         "a pretensão de {pessoa}")
+NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Larissa', 'Marcos']
+COMPANIES = ['Alfa Comércio Ltda.', 'Beta Serviços S.A.', 'Gama Indústria Ltda.', 'Delta Transportes Ltda.']
+ENTITIES = [('estadual', 'estadual'), ('municipal', 'municipal'), ('federal', 'federal')]
+PARTIES = ['Partido A', 'Partido B', 'Partido C']
+
+
+def _sentences(text):
+    text = ' '.join(str(text or '').split())
+    return [s.strip() for s in SENTENCE_RE.split(text) if len(s.strip()) >= MIN_SENTENCE_CHARS]
+
+
+def _negate(sentence):
+    lowered = sentence[:1].lower() + sentence[1:] # So "É constitucional..." becomes "Não é..." and not "não É..."
+    for pattern, replacement in NEGATION_RULES:
+        negated, n = re.subn(pattern, replacement, lowered, count=1, flags=re.IGNORECASE)
+        if n:
+            return negated[:1].upper() + negated[1:]
+    return None
+
+
+def make_assertivas(record):
+    # True statements come straight from the tese; false ones flip its key predicate
+    source = f"Inf. {record['numero_informativo']}"
+    assertivas = []
+    sentences = _sentences(record['tese_julgamento'])
+    for i, sentence in enumerate(sentences[:MAX_ASSERTIVAS - 1]):
+        negated = _negate(sentence) if i % 2 or len(sentences) == 1 else None # Alternate so a julgado gets both kinds
+        if not negated or len(sentences) == 1:
+            assertivas.append({'enunciado': sentence, 'gabarito': True,
+                               'justificativa': f"Verdadeiro. É o entendimento fixado pelo STF ({source})."})
+        if negated:
+            assertivas.append({'enunciado': negated, 'gabarito': False,
+                               'justificativa': f"Falso. Segundo o STF ({source}): \"{sentence}\""})
+    rg = record.get('repercussao_geral')
+    if rg in ('Sim', 'Não'):
+        assertivas.append({'enunciado': f"O julgado noticiado no {source} ({record['classe_processo']}) teve repercussão geral reconhecida.",
+                           'gabarito': rg == 'Sim',
+                           'justificativa': f"{'Verdadeiro' if rg == 'Sim' else 'Falso'}. Repercussão geral: {rg}."})
+    return assertivas
+
+
+def make_caso(record):
+    # Template chosen by ramo; names/entities picked from a stable hash of the id, so reruns give the same text
+    seed = zlib.crc32(str(record['id']).encode())
+    situation, issue = next((CASE_TEMPLATES[r] for r in record['ramos'] if r in CASE_TEMPLATES), DEFAULT_CASE_TEMPLATE)
+    ente, ente_adj = ENTITIES[seed % len(ENTITIES)]
+    values = {
+        'pessoa': NAMES[seed % len(NAMES)], 'empresa': COMPANIES[seed % len(COMPANIES)], 'ente': ente, 'ente_adj': ente_adj,
+        'partido': PARTIES[seed % len(PARTIES)], 'classe': record['classe_processo'] or "recurso",
+    }
+    sentences = _sentences(record['tese_julgamento']) or [str(record['tese_julgamento'] or record['Título'])]
+    return {
+        'situacao': situation.format(**values),
+        'pergunta': f"À luz da jurisprudência do STF, como deve ser resolvida a controvérsia sobre {issue.format(**values)}?",
+        'resposta': sentences[0],
+        'fundamento': str(record['Legislação'] or ''),
+        'referencia': f"Inf. {record['numero_informativo']} — {record['Título']}",
+    }
+
+
+def generate_chunk(records):
+    # Runs in a worker process: pure function of the records
+    return [(record['id'], record['content_hash'], make_assertivas(record), make_caso(record)) for record in records]
+
+
+def _plain(record):
+    # Picklable, JSON-friendly copy for the worker processes
+    return {key: (None if not isinstance(value, (list, tuple)) and pd.isna(value) else value)
+            for key, value in record.items() if key != 'data_julgamento'}
+
+
+def pending_records(dataset, store, force=False):
+    done = {} if force else store.hashes()
+    pending = []
+    for row in range(len(dataset)):
+        record = dataset.record_at(row)
+        record['content_hash'] = content_hash(record, record['ramos'])
+        if done.get(str(record['id'])) != record['content_hash']:
+            pending.append(_plain(record))
+    return pending
+
+
+def run(excel_path, snapshot_dir=data_store.SNAPSHOT_DIR, db_path=None, workers=None, chunk_size=CHUNK_SIZE, force=False):
+    dataset, _ = data_store.load_snapshot(excel_path, snapshot_dir)
+    store = ContentStore(db_path) if db_path else ContentStore()
+    pending = pending_records(dataset, store, force)
+    print(f"{len(dataset)} julgados, {len(pending)} com conteúdo novo ou desatualizado.")
+    start = time.perf_counter()
+    done = 0
+    if pending:
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(generate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                results = future.result()
+                store.put_many(results) # Checkpoint: an interrupted run resumes after the last committed chunk
+                done += len(results)
+                print(f"  {done}/{len(pending)} julgados gravados")
+    removed = store.remove_missing(dataset.julgados['id'].tolist())
+    print(f"Concluído em {time.perf_counter() - start:.1f}s ({done} gerados, {removed} removidos).")
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera assertivas e casos práticos para todos os julgados (offline).")
+    parser.add_argument('--excel', default="Dados_InformativosSTF.xlsx", help="Planilha principal usada pelo app")
+    parser.add_argument('--cache-dir', default=data_store.SNAPSHOT_DIR, help="Diretório do snapshot")
+    parser.add_argument('--db', help="Banco de conteúdo (padrão: INFORMATIVOS_CONTENT_DB ou informativos_conteudo.sqlite3)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processos em paralelo")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Julgados por lote gravado")
+    parser.add_argument('--force', action='store_true', help="Regenera tudo, mesmo o que não mudou")
+    args = parser.parse_args()
+    run(args.excel, args.cache_dir, args.db, args.workers, args.chunk_size, args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+
+import data_store
+import related
+import search_index
+
+# --- Ingestão Incremental de Novos Informativos ---
+# Uso: python ingest.py novos_informativos.xlsx [outro_lote.csv ...]
+#      python ingest.py   (sem lotes: só prepara o snapshot e os índices da planilha atual)
+# Cada lote passa pelo mesmo processamento do Excel principal e é mesclado (upsert por
+# numero_informativo + id) ao snapshot. Os processos do app em execução passam a usar a
+# nova versão na próxima interação, sem recarregar a planilha completa.
+# Os índices derivados (busca e julgados relacionados) são calculados aqui, fora do app: rode este
+# script no deploy e sempre que a planilha principal for substituída.
+
+
+def build_indexes(dataset, changed_rows=None, previous=None):
+    # Search index + related julgados of a version about to be published; incremental from the previous version after a batch
+    if previous is None:
+        search_index.load_or_build(dataset.julgados, dataset.version, dataset.paths['search'])
+        related.load_or_build(dataset.julgados, dataset.version, dataset.paths['related'])
+        return
+    search_index.update_saved(dataset.julgados, changed_rows, previous.version, previous.paths['search'],
+                              dataset.version, dataset.paths['search'])
+    related.update_saved(dataset.julgados, changed_rows, previous.version, previous.paths['related'],
+                         dataset.version, dataset.paths['related'])
+
+
+def prepare(excel_path, snapshot_dir=data_store.SNAPSHOT_DIR):
+    # Snapshot + search index + related julgados for the current version; no-op for files that already exist
+    dataset, _ = data_store.load_snapshot(excel_path, snapshot_dir, derive=build_indexes)
+    build_indexes(dataset) # A snapshot published by the app itself has no related file yet
+    return dataset
+
+
+def ingest(excel_path, batch_paths, snapshot_dir=data_store.SNAPSHOT_DIR):
+    # Each new version is published (manifest written) only after its indexes, under the snapshot lock
+    for batch_path in batch_paths:
+        data_store.ingest_batch(excel_path, batch_path, snapshot_dir, derive=build_indexes)
+    prepare(excel_path, snapshot_dir) # Also covers a replaced spreadsheet, whose new version has no indexes yet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingere novos lotes de informativos (Excel ou CSV) no snapshot de dados.")
+    parser.add_argument('lotes', nargs='*', help="Arquivos .xlsx ou .csv com as mesmas colunas do Excel principal (opcional)")
+    parser.add_argument('--excel', default="Dados_InformativosSTF.xlsx", help="Planilha principal usada pelo app")
+    parser.add_argument('--cache-dir', default=data_store.SNAPSHOT_DIR, help="Diretório do snapshot")
+    args = parser.parse_args()
+    if not os.path.exists(args.excel):
+        # Not an error at deploy time: the app starts anyway and reports the missing spreadsheet itself
+        print(f"Planilha {args.excel} não encontrada; nada a preparar.")
+        return
+    ingest(args.excel, args.lotes, args.cache_dir)
+
+
+if __name__ == '__main__':
+    main()
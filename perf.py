@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# --- Configuração (variáveis de ambiente no deploy) ---
+ENABLED = os.environ.get('INFORMATIVOS_PERF', '1') != '0' # 0 turns every span into a no-op
+MAX_SAMPLES = int(os.environ.get('INFORMATIVOS_PERF_SAMPLES', 2048)) # Sliding window per stage for the percentiles
+EXPORT_PATH = os.environ.get('INFORMATIVOS_METRICS_FILE') # Optional JSON file rewritten periodically
+EXPORT_INTERVAL = float(os.environ.get('INFORMATIVOS_METRICS_INTERVAL', 30))
+PERCENTILES = (50, 95, 99)
+_NULL_SPAN = nullcontext()
+
+
+def _iso_time(timestamp):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(timestamp))
+
+
+class Metrics:
+    # Process-wide timing histograms, shared by every session
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = {} # stage -> deque of the most recent durations (seconds)
+        self._totals = {} # stage -> [count, total seconds, max seconds] since start/reset
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._exported_at = 0.0
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.max_samples)
+                self._totals[stage] = [0, 0.0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def summary(self):
+        # {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}; percentiles over the sliding window
+        with self._lock:
+            snapshot = {stage: (np.fromiter(samples, dtype=float), list(self._totals[stage]))
+                        for stage, samples in self._samples.items()}
+        summary = {}
+        for stage, (samples, (count, total, longest)) in sorted(snapshot.items()):
+            quantiles = np.percentile(samples, PERCENTILES) * 1000
+            summary[stage] = {
+                'count': count,
+                'mean_ms': total / count * 1000,
+                **{f'p{p}_ms': float(q) for p, q in zip(PERCENTILES, quantiles)},
+                'max_ms': longest * 1000,
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self.started_at = time.time()
+
+    def to_json(self):
+        return json.dumps({
+            'started_at': _iso_time(self.started_at),
+            'exported_at': _iso_time(time.time()),
+            'window': self.max_samples,
+            'stages': self.summary(),
+        }, indent=2)
+
+    def export(self, path=EXPORT_PATH, interval=EXPORT_INTERVAL):
+        # Throttled atomic rewrite, so a scraper never reads a half-written file
+        if not path:
+            return
+        with self._lock: # Check-and-set: only one of the sessions finishing together writes
+            now = time.monotonic()
+            if now - self._exported_at < interval:
+                return
+            self._exported_at = now
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_json())
+            os.replace(tmp_path, path)
+        except OSError as e: # Never surfaces in a user's page
+            print(f"Aviso: não foi possível gravar as métricas em {path} ({e}).")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'index', 'start')
+
+    def __init__(self, trace, stage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        trace = self.trace
+        self.index = len(trace.spans)
+        trace.spans.append([trace.depth, self.stage, None]) # Filled on exit; keeps start order for nesting
+        trace.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        trace = self.trace
+        trace.depth -= 1
+        trace.spans[self.index][2] = elapsed
+        trace.metrics.record(self.stage, elapsed)
+        return False
+
+
+class RerunTrace:
+    # Spans of a single script run (per-rerun view) that also feed the process histograms
+    def __init__(self, metrics, total_stage='rerun.total'):
+        self.metrics = metrics
+        self.total_stage = total_stage # 'rerun.fragmento' for a fragment-only rerun
+        self.enabled = ENABLED and metrics is not None
+        self.spans = [] # [depth, stage, seconds]
+        self.depth = 0
+        self.started = time.perf_counter()
+        self.total = None
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NULL_SPAN
+
+    def finish(self):
+        if not self.enabled:
+            return
+        self.total = time.perf_counter() - self.started
+        self.metrics.record(self.total_stage, self.total)
+        self.metrics.export()
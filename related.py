@@ -0,0 +1,206 @@
+import os
+import zlib
+
+import numpy as np
+import scipy.sparse as sp
+
+from data_store import temp_path
+from search_index import STOPWORDS, TOKEN_RE, fold, stem
+
+# --- Julgados Relacionados (TF-IDF com hashing + top-k pré-calculado) ---
+# Offline: built by ingest.py next to the snapshot (and updated on each batch); the app only loads the file
+# and reads neighbours[row], and shows no related julgados while the file for the current version is missing.
+TEXT_COLUMNS = ['Título', 'tese_julgamento', 'Resumo']
+LEGISLATION_COLUMN = 'Legislação' # Hashed apart from the text, so "same legislação" is its own signal
+RELATED_FORMAT = 1 # Bump whenever the features or the weighting change
+N_FEATURES = 2 ** 20
+TOP_K = int(os.environ.get('INFORMATIVOS_RELATED_K', 5))
+BLOCK_BYTES = int(os.environ.get('INFORMATIVOS_RELATED_BLOCK_MB', 64)) * 1024 * 1024 # Dense similarity block budget
+MIN_SCORE = 0.05 # Below this a "neighbour" only shares boilerplate
+
+
+class _Featurizer:
+    # Stemmed unigrams + bigrams hashed with crc32 (stable across processes, unlike hash())
+    def __init__(self):
+        self._stems = {}
+        self._ids = {}
+
+    def _feature(self, key):
+        feature = self._ids.get(key)
+        if feature is None:
+            feature = self._ids[key] = zlib.crc32(key.encode()) % N_FEATURES
+        return feature
+
+    def features(self, text, tag):
+        stems = []
+        for word in TOKEN_RE.findall(fold(text)):
+            if word in STOPWORDS:
+                continue
+            stemmed = self._stems.get(word)
+            if stemmed is None:
+                stemmed = self._stems[word] = stem(word)
+            stems.append(stemmed)
+        grams = [f"{tag}{s}" for s in stems] + [f"{tag}{a} {b}" for a, b in zip(stems, stems[1:])]
+        return [self._feature(g) for g in grams]
+
+
+def _count_matrix(julgados, rows):
+    # Raw term counts (rows x N_FEATURES) for the given julgado rows, in the order of `rows`
+    featurizer = _Featurizer()
+    text_columns = [julgados[col].astype(str).to_numpy()[rows] for col in TEXT_COLUMNS if col in julgados.columns]
+    legislation = (julgados[LEGISLATION_COLUMN].astype(str).to_numpy()[rows] if LEGISLATION_COLUMN in julgados.columns
+                   else [''] * len(rows))
+    features, lengths = [], np.zeros(len(rows), dtype=np.int64)
+    for i, (texts, law) in enumerate(zip(zip(*text_columns), legislation)):
+        row_features = featurizer.features(' '.join(texts), 'T|') + featurizer.features(law, 'L|')
+        features.append(np.asarray(row_features, dtype=np.int32))
+        lengths[i] = len(row_features)
+    columns = np.concatenate(features) if features else np.empty(0, dtype=np.int32)
+    doc_rows = np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+    counts = sp.csr_matrix((np.ones(len(columns), dtype=np.float32), (doc_rows, columns)), shape=(len(rows), N_FEATURES))
+    counts.sum_duplicates()
+    return counts
+
+
+def _weights(counts):
+    # Sublinear tf * smoothed idf, rows L2-normalised so a dot product is the cosine similarity
+    n_docs = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=N_FEATURES)
+    idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+    weighted = counts.copy()
+    weighted.data = (1 + np.log(weighted.data)) * idf[weighted.indices]
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sp.csr_matrix(sp.diags(1 / norms).dot(weighted), dtype=np.float32)
+
+
+def _top_k(weights, rows, k):
+    # Neighbours of `rows` against every julgado, a block of rows at a time so the dense block stays within BLOCK_BYTES
+    n_docs = weights.shape[0]
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    block_size = max(1, BLOCK_BYTES // (4 * max(n_docs, 1)))
+    transposed = weights.T.tocsr()
+    for start in range(0, len(rows), block_size):
+        block_rows = np.asarray(rows[start:start + block_size])
+        similarity = (weights[block_rows] @ transposed).toarray()
+        similarity[np.arange(len(block_rows)), block_rows] = -1 # Never its own neighbour
+        take = min(k, n_docs - 1)
+        if take <= 0:
+            continue
+        top = np.argpartition(-similarity, take - 1, axis=1)[:, :take]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        weak = top_scores < MIN_SCORE
+        top[weak], top_scores[weak] = -1, 0
+        neighbours[start:start + len(block_rows), :take] = top
+        scores[start:start + len(block_rows), :take] = top_scores
+    return neighbours, scores
+
+
+class RelatedIndex:
+    def __init__(self, version, counts, neighbours, scores):
+        self.version = version
+        self.counts = counts # Raw counts, kept so an ingestion only re-tokenizes the changed julgados (None when loaded for the app)
+        self.neighbours = neighbours # (n_julgados x k) row codes, -1 = none
+        self.scores = scores # Cosine similarity of each neighbour
+
+    @classmethod
+    def build(cls, julgados, version, k=TOP_K):
+        rows = np.arange(len(julgados), dtype=np.int32)
+        counts = _count_matrix(julgados, rows)
+        neighbours, scores = _top_k(_weights(counts), rows, k)
+        return cls(version, counts, neighbours, scores)
+
+    def updated(self, julgados, changed_rows, version):
+        # Changed rows get exact neighbours; other rows keep their lists, merged with their similarity to the
+        # changed rows. Rows whose list pointed at a changed julgado are recomputed, since the next-best
+        # candidate is unknown. Untouched scores keep the previous idf until the next full build.
+        changed_rows = np.asarray(changed_rows, dtype=np.int32)
+        n_docs, k = len(julgados), self.neighbours.shape[1]
+        n_old = self.counts.shape[0]
+        is_changed = np.zeros(n_docs, dtype=bool)
+        is_changed[changed_rows] = True
+        # Swap the changed rows' counts: zero them in the (padded) old matrix, then scatter the new ones in
+        padded = sp.vstack([self.counts, sp.csr_matrix((n_docs - n_old, N_FEATURES), dtype=np.float32)], format='csr')
+        scatter = sp.csr_matrix((np.ones(len(changed_rows), dtype=np.float32), (changed_rows, np.arange(len(changed_rows)))),
+                                shape=(n_docs, len(changed_rows)))
+        counts = sp.diags((~is_changed).astype(np.float32)) @ padded + scatter @ _count_matrix(julgados, changed_rows)
+        counts = sp.csr_matrix(counts, dtype=np.float32)
+        counts.eliminate_zeros()
+        weights = _weights(counts)
+
+        neighbours = np.vstack([self.neighbours, np.full((n_docs - n_old, k), -1, dtype=np.int32)])
+        scores = np.vstack([self.scores, np.zeros((n_docs - n_old, k), dtype=np.float32)])
+        stale = is_changed | (is_changed[np.maximum(neighbours, 0)] & (neighbours >= 0)).any(axis=1)
+        recompute = np.flatnonzero(stale).astype(np.int32)
+        neighbours[recompute], scores[recompute] = _top_k(weights, recompute, k)
+
+        # Remaining rows: could a changed julgado enter their top-k?
+        keep = np.flatnonzero(~stale)
+        changed_weights_t = weights[changed_rows].T.tocsr()
+        block_size = max(1, BLOCK_BYTES // (4 * max(len(changed_rows), 1)))
+        for start in range(0, len(keep) if len(changed_rows) else 0, block_size):
+            block = keep[start:start + block_size]
+            to_changed = (weights[block] @ changed_weights_t).toarray()
+            candidates = np.hstack([neighbours[block], np.broadcast_to(changed_rows, to_changed.shape)])
+            candidate_scores = np.hstack([scores[block], to_changed]).astype(np.float32)
+            candidate_scores[(candidates < 0) | (candidate_scores < MIN_SCORE)] = -1
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+            merged, merged_scores = np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+            merged[merged_scores < 0], merged_scores[merged_scores < 0] = -1, 0
+            neighbours[block], scores[block] = merged, merged_scores
+        return RelatedIndex(version, counts, neighbours, scores)
+
+    def related(self, row):
+        # -> [(row code, similarity)], best first; a plain array lookup, nothing is computed here
+        return [(int(r), float(s)) for r, s in zip(self.neighbours[row], self.scores[row]) if r >= 0]
+
+    # --- Persistência (ao lado do snapshot) ---
+    def save(self, path):
+        tmp_path = temp_path(path, '.npz') # np.savez insists on the .npz suffix
+        np.savez(tmp_path, format=np.int32(RELATED_FORMAT), version=np.str_(self.version),
+                 counts_data=self.counts.data, counts_indices=self.counts.indices, counts_indptr=self.counts.indptr,
+                 neighbours=self.neighbours, scores=self.scores)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, version, with_counts=True):
+        # np.load reads each array on access: without counts (only ingest needs them) the lists cost k values per julgado
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['format']) != RELATED_FORMAT or str(data['version']) != version:
+                    return None
+                neighbours = data['neighbours']
+                counts = None
+                if with_counts:
+                    counts = sp.csr_matrix((data['counts_data'], data['counts_indices'], data['counts_indptr']),
+                                           shape=(len(neighbours), N_FEATURES))
+                return cls(version, counts, neighbours, data['scores'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def load_saved(version, path):
+    # The app's entry point: never builds (that is hours of CPU on a large corpus) and skips the raw counts
+    return RelatedIndex.load(path, version, with_counts=False) if os.path.exists(path) else None
+
+
+def load_or_build(julgados, version, path):
+    index = RelatedIndex.load(path, version) if os.path.exists(path) else None
+    if index is None:
+        print(f"Calculando julgados relacionados ({len(julgados)} julgados)...")
+        index = RelatedIndex.build(julgados, version)
+        index.save(path)
+        print(f"Julgados relacionados gravados em {path}")
+    return index
+
+
+def update_saved(julgados, changed_rows, previous_version, previous_path, version, path):
+    # Incremental update after a batch ingestion; falls back to a full build without a previous file
+    previous = RelatedIndex.load(previous_path, previous_version) if os.path.exists(previous_path) else None
+    index = RelatedIndex.build(julgados, version) if previous is None else previous.updated(julgados, changed_rows, version)
+    index.save(path)
+    print(f"Julgados relacionados atualizados em {path} ({len(changed_rows)} julgados recalculados)")
+    return index
@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from search_index import parse_query
+
+# --- Limites (ajustáveis por variável de ambiente no deploy) ---
+MAX_ENTRIES = int(os.environ.get('INFORMATIVOS_RESULT_CACHE_ENTRIES', 512))
+MAX_BYTES = int(os.environ.get('INFORMATIVOS_RESULT_CACHE_MB', 64)) * 1024 * 1024
+TTL_SECONDS = float(os.environ.get('INFORMATIVOS_RESULT_CACHE_TTL', 600))
+
+
+def canonical_key(selections, search_query=''):
+    # Same filters in any order / same query modulo accents, case and spacing -> same key
+    facets = tuple(sorted((facet, tuple(sorted(map(str, values)))) for facet, values in selections.items() if values))
+    clauses = tuple((kind, tuple(value) if isinstance(value, list) else value)
+                    for kind, value in parse_query(search_query or ''))
+    return facets, clauses
+
+
+def _entry_bytes(value, _seen=None):
+    # Footprint of a cached value, walking nested dicts/lists (facet counts, chart specs) as well as arrays.
+    # Strings and numbers shared with other entries are counted again, so this errs on the high side.
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value) - (value.nbytes if value.base is None else 0) # getsizeof includes owned data
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_entry_bytes(k, seen) + _entry_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_entry_bytes(item, seen) for item in value)
+    return size
+
+
+class ResultCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl_seconds=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (stored_at, size, value)
+        self._lock = threading.Lock() # Streamlit runs each session on its own thread
+        self._bytes = 0
+        self._inflight = {} # (version, key) -> Future of the computation one session is running for everyone
+        self.version = None
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = self.coalesced = 0
+
+    def _check_version(self, version):
+        # A new data snapshot makes every cached result stale
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self.version = version
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key, version):
+        # Caller holds self._lock
+        self._check_version(version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry[0] > self.ttl_seconds:
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def get(self, key, version):
+        with self._lock:
+            return self._lookup(key, version)
+
+    def put(self, key, value, version):
+        # Cached arrays are shared across sessions, so freeze them
+        for array in (value.values() if isinstance(value, dict) else [value]):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+        size = _entry_bytes(key) + _entry_bytes(value)
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, version, compute):
+        # Single flight: when many sessions miss the same key at once, the first one computes and the others
+        # wait for its result instead of all recomputing it
+        while True:
+            with self._lock:
+                value = self._lookup(key, version)
+                if value is not None:
+                    return value
+                flight = self._inflight.get((version, key))
+                if flight is None:
+                    flight = self._inflight[(version, key)] = Future()
+                    break
+                self.coalesced += 1
+            value = flight.result()
+            if value is not None:
+                return value
+            # The computing session failed or was interrupted (a Streamlit rerun): its exception is not ours, try again
+        value = None
+        try:
+            value = self.put(key, compute(), version)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[(version, key)]
+            flight.set_result(value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+            }
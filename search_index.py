@@ -0,0 +1,273 @@
+import bisect
+import functools
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from data_store import temp_path
+
+# --- Normalização de Texto (acentos, caixa, radicais) ---
+SEARCH_COLUMNS = ['Título', 'tese_julgamento', 'Resumo']
+INDEX_FORMAT = 1 # Bump whenever tokenization/stemming changes
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+STOPWORDS = frozenset(
+    "a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por que se sem sob sobre um uma".split()
+)
+# Plural endings first, then nominal/adjectival suffixes (a light RSLP-style stemmer, accents already folded)
+PLURAL_RULES = [('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'), ('ns', 'm'), ('res', 'r'), ('s', '')]
+SUFFIXES = sorted(
+    ['amento', 'imento', 'mente', 'idade', 'acao', 'icao', 'ador', 'adora', 'ante', 'ancia', 'encia',
+     'avel', 'ivel', 'ismo', 'ista', 'ico', 'ica', 'ivo', 'iva', 'oso', 'osa'],
+    key=len, reverse=True,
+)
+MIN_STEM = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSION = 64
+
+
+def fold(text):
+    # "Repercussão" -> "repercussao"
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+@functools.lru_cache(maxsize=1 << 18) # A corpus repeats the same few thousand words; stemming each occurrence dominated the build
+def stem(token):
+    if len(token) <= MIN_STEM or token.isdigit():
+        return token
+    for ending, replacement in PLURAL_RULES:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM and not token.endswith('ss'):
+            token = token[:-len(ending)] + replacement
+            break
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+            token = token[:-len(suffix)]
+            break
+    if token[-1] in 'aeo' and len(token) > MIN_STEM:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [stem(token) for token in TOKEN_RE.findall(fold(text))]
+
+
+def parse_query(query):
+    # -> list of clauses: ('term', stem) | ('prefix', folded) | ('phrase', [stems])
+    clauses, stopword = [], []
+    for phrase, word in QUERY_RE.findall(query):
+        if phrase:
+            words = TOKEN_RE.findall(fold(phrase))
+            if len(words) == 1:
+                clauses.append(('term', stem(words[0])))
+                stopword.append(words[0] in STOPWORDS)
+            elif words:
+                clauses.append(('phrase', [stem(w) for w in words]))
+                stopword.append(False)
+            continue
+        prefix = word.endswith('*')
+        for token in TOKEN_RE.findall(fold(word)):
+            clauses.append(('prefix', token) if prefix else ('term', stem(token)))
+            stopword.append(not prefix and token in STOPWORDS) # Checked before stemming: "para" stems to "par"
+    # Bare stopwords only narrow nothing down; keep them if the query has nothing else
+    meaningful = [clause for clause, is_stopword in zip(clauses, stopword) if not is_stopword]
+    return meaningful or clauses
+
+
+# --- Índice Invertido Posicional ---
+class SearchIndex:
+    def __init__(self, version, vocab, post_offsets, post_docs, post_tf, pos_offsets, positions, doc_len):
+        self.version = version
+        self.vocab = vocab # Sorted, so prefix queries are a bisect
+        self.term_id = {term: i for i, term in enumerate(vocab)}
+        self.post_offsets = post_offsets
+        self.post_docs = post_docs
+        self.post_tf = post_tf
+        self.pos_offsets = pos_offsets
+        self.positions = positions
+        self.doc_len = doc_len
+        self.n_docs = len(doc_len)
+        self.avg_len = float(doc_len.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls, julgados, version):
+        rows = np.arange(len(julgados), dtype=np.int32)
+        vocab, term_ids, doc_ids, token_pos = _tokenize_rows(julgados, rows)
+        return cls._from_tokens(version, vocab, term_ids, doc_ids, token_pos, len(julgados))
+
+    def updated(self, julgados, changed_rows, version):
+        # Re-tokenizes only inserted/updated julgados; the other documents' postings are reused as-is
+        changed_rows = np.asarray(changed_rows, dtype=np.int32)
+        token_terms = np.repeat(np.repeat(np.arange(len(self.vocab), dtype=np.int32), np.diff(self.post_offsets)), self.post_tf)
+        token_docs = np.repeat(self.post_docs, self.post_tf)
+        keep = ~np.isin(token_docs, changed_rows)
+        new_vocab, new_terms, new_docs, new_pos = _tokenize_rows(julgados, changed_rows)
+
+        vocab = sorted(set(self.vocab).union(new_vocab))
+        lookup = np.array(vocab, dtype=object)
+        old_remap = np.searchsorted(lookup, np.array(self.vocab, dtype=object)).astype(np.int32)
+        new_remap = np.searchsorted(lookup, np.array(new_vocab, dtype=object)).astype(np.int32)
+        term_ids = np.concatenate([old_remap[token_terms[keep]], new_remap[new_terms]])
+        doc_ids = np.concatenate([token_docs[keep], new_docs])
+        token_pos = np.concatenate([self.positions[keep], new_pos])
+        return SearchIndex._from_tokens(version, vocab, term_ids, doc_ids, token_pos, len(julgados))
+
+    @classmethod
+    def _from_tokens(cls, version, vocab, term_ids, doc_ids, token_pos, n_docs):
+        # Sort tokens by (term, doc, position); one posting per (term, doc) with positions stored CSR-style
+        order = np.lexsort((token_pos, doc_ids, term_ids))
+        term_ids, doc_ids, token_pos = term_ids[order], doc_ids[order].astype(np.int32), token_pos[order].astype(np.int32)
+        n_tokens = len(term_ids)
+        new_posting = np.ones(n_tokens, dtype=bool)
+        new_posting[1:] = (term_ids[1:] != term_ids[:-1]) | (doc_ids[1:] != doc_ids[:-1])
+        starts = np.flatnonzero(new_posting)
+        pos_offsets = np.append(starts, n_tokens).astype(np.int64)
+        post_docs = doc_ids[starts]
+        post_tf = np.diff(pos_offsets).astype(np.int32)
+        post_offsets = np.searchsorted(term_ids[starts], np.arange(len(vocab) + 1)).astype(np.int64)
+        doc_len = np.bincount(doc_ids, minlength=n_docs).astype(np.int32)
+        return cls(version, list(vocab), post_offsets, post_docs, post_tf, pos_offsets, token_pos, doc_len)
+
+    # --- Persistência (ao lado do snapshot) ---
+    def save(self, path):
+        tmp_path = temp_path(path, '.npz') # np.savez insists on the .npz suffix
+        np.savez(tmp_path, format=np.int32(INDEX_FORMAT), version=np.str_(self.version),
+                 vocab=np.array(self.vocab, dtype=str), post_offsets=self.post_offsets, post_docs=self.post_docs,
+                 post_tf=self.post_tf, pos_offsets=self.pos_offsets, positions=self.positions, doc_len=self.doc_len)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, version):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['format']) != INDEX_FORMAT or str(data['version']) != version:
+                    return None
+                return cls(version, data['vocab'].tolist(), data['post_offsets'], data['post_docs'], data['post_tf'],
+                           data['pos_offsets'], data['positions'], data['doc_len'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    # --- Consulta ---
+    def _postings(self, term):
+        i = self.term_id.get(term)
+        if i is None:
+            return None
+        return slice(int(self.post_offsets[i]), int(self.post_offsets[i + 1]))
+
+    def _bm25(self, docs, tf):
+        idf = np.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / max(self.avg_len, 1e-9))
+        return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    def _term(self, term):
+        span = self._postings(term)
+        if span is None:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        docs = self.post_docs[span]
+        return docs, self._bm25(docs, self.post_tf[span].astype(float))
+
+    def _prefix(self, prefix):
+        # The vocabulary holds stems, which are often shorter than the typed prefix ("repercussao*" vs "repercuss"),
+        # so the stemmed prefix is looked up too
+        term_ids = set()
+        for candidate in {prefix, stem(prefix)}:
+            lo = bisect.bisect_left(self.vocab, candidate)
+            term_ids.update(range(lo, bisect.bisect_left(self.vocab, candidate + '\uffff')))
+        term_ids = np.array(sorted(term_ids), dtype=np.int64)
+        if len(term_ids) > MAX_PREFIX_EXPANSION: # Keep the most frequent expansions
+            df = self.post_offsets[term_ids + 1] - self.post_offsets[term_ids]
+            term_ids = term_ids[np.argsort(-df, kind='stable')[:MAX_PREFIX_EXPANSION]]
+        terms = [self.vocab[i] for i in term_ids]
+        results = [self._term(term) for term in terms]
+        if not results:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        docs = np.concatenate([r[0] for r in results])
+        scores = np.concatenate([r[1] for r in results])
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        return unique_docs, np.bincount(inverse, weights=scores, minlength=len(unique_docs))
+
+    def _encoded_positions(self, span, offset):
+        # Every occurrence of a term as (doc << 32 | position - offset); a term's postings and positions are contiguous
+        docs = np.repeat(self.post_docs[span].astype(np.int64), self.post_tf[span])
+        positions = self.positions[self.pos_offsets[span.start]:self.pos_offsets[span.stop]].astype(np.int64) - offset
+        return (docs << 32) | (positions & 0xFFFFFFFF)
+
+    def _phrase(self, terms):
+        spans = [self._postings(term) for term in terms]
+        if any(span is None for span in spans):
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        # Rarest term first so the intersections stay small
+        order = sorted(range(len(spans)), key=lambda i: spans[i].stop - spans[i].start)
+        matches = None
+        for i in order:
+            encoded = self._encoded_positions(spans[i], i)
+            matches = encoded if matches is None else np.intersect1d(matches, encoded, assume_unique=True)
+            if not len(matches):
+                return np.empty(0, dtype=np.int32), np.empty(0)
+        docs, counts = np.unique((matches >> 32).astype(np.int32), return_counts=True)
+        return docs, self._bm25(docs, counts.astype(float))
+
+    def search(self, query, rows=None):
+        # Returns (row codes ranked by BM25, scores); every clause must match
+        clauses = parse_query(query)
+        if not clauses:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        matched, total = None, None
+        for kind, value in clauses:
+            docs, scores = {'term': self._term, 'prefix': self._prefix, 'phrase': self._phrase}[kind](value)
+            if matched is None:
+                matched, total = docs, scores
+                continue
+            matched, left, right = np.intersect1d(matched, docs, assume_unique=True, return_indices=True)
+            total = total[left] + scores[right]
+            if not len(matched):
+                break
+        if rows is not None:
+            keep = np.isin(matched, rows)
+            matched, total = matched[keep], total[keep]
+        order = np.argsort(-total, kind='stable')
+        return matched[order], total[order]
+
+
+def _tokenize_rows(julgados, rows):
+    # -> (sorted vocab, term id per token, doc per token, position per token) for the given rows
+    columns = [julgados[col].astype(str).to_numpy()[rows] for col in SEARCH_COLUMNS if col in julgados.columns]
+    vocab_ids = {}
+    term_chunks = []
+    doc_len = np.zeros(len(rows), dtype=np.int64)
+    for i, texts in enumerate(zip(*columns)):
+        ids = [vocab_ids.setdefault(term, len(vocab_ids)) for term in tokenize(' '.join(texts))]
+        term_chunks.append(np.asarray(ids, dtype=np.int32))
+        doc_len[i] = len(ids)
+    term_ids = np.concatenate(term_chunks) if term_chunks else np.empty(0, dtype=np.int32)
+    doc_ids = np.repeat(np.asarray(rows, dtype=np.int32), doc_len)
+    token_pos = (np.arange(len(term_ids)) - np.repeat(np.cumsum(doc_len) - doc_len, doc_len)).astype(np.int32)
+
+    # Term ids follow sorted-vocab order so prefix queries can bisect
+    vocab = sorted(vocab_ids)
+    remap = np.empty(len(vocab_ids), dtype=np.int32)
+    remap[[vocab_ids[t] for t in vocab]] = np.arange(len(vocab), dtype=np.int32)
+    return vocab, (remap[term_ids] if len(term_ids) else term_ids), doc_ids, token_pos
+
+
+def load_or_build(julgados, version, path):
+    index = SearchIndex.load(path, version) if os.path.exists(path) else None
+    if index is None:
+        print(f"Construindo índice de busca ({len(julgados)} julgados)...")
+        index = SearchIndex.build(julgados, version)
+        index.save(path)
+        print(f"Índice de busca gravado em {path} ({len(index.vocab)} termos)")
+    return index
+
+
+def update_saved(julgados, changed_rows, previous_version, previous_path, version, path):
+    # Incremental update after a batch ingestion; falls back to a full build without a previous index
+    previous = SearchIndex.load(previous_path, previous_version) if os.path.exists(previous_path) else None
+    index = SearchIndex.build(julgados, version) if previous is None else previous.updated(julgados, changed_rows, version)
+    index.save(path)
+    print(f"Índice de busca atualizado em {path} ({len(changed_rows)} julgados reindexados)")
+    return index
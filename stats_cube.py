@@ -0,0 +1,119 @@
+import numpy as np
+
+from filter_engine import LINK_FACETS
+
+# --- Cubo de Contagens (aba Estatísticas) ---
+# One cell per distinct (ano, ano_mes, classe, RG, ramo combination); each julgado falls in exactly one cell,
+# so summing cells counts unique julgados. Ramo/área roll-ups go through combination membership
+# matrices, which keeps a julgado with two ramos of the same área counted once for that área.
+# numero_informativo is left out on purpose: it would make the cube about as large as the data,
+# and a single-informativo selection is small enough to count from its rows.
+CUBE_FACETS = ['ano_julgamento', 'ano_mes_julgamento', 'classe_processo', 'repercussao_geral']
+
+
+def _unique_rows(matrix):
+    # np.unique(axis=0) sorts a structured view and is slow; packing each row into one int64 is much faster
+    shifted = matrix.astype(np.int64) + 1 # Codes start at -1 (missing)
+    radices = shifted.max(axis=0, initial=0) + 1
+    if np.prod(radices.astype(float)) >= 2 ** 62:
+        return np.unique(matrix, axis=0, return_inverse=True, return_counts=True)
+    packed = np.zeros(len(matrix), dtype=np.int64)
+    for column, radix in zip(shifted.T, radices):
+        packed = packed * radix + column
+    _, first, inverse, counts = np.unique(packed, return_index=True, return_inverse=True, return_counts=True)
+    return matrix[first], inverse, counts
+
+
+class StatsCube:
+    def __init__(self, engine):
+        self.version = engine.version
+        self.values = engine.values
+        self.code_of = engine.code_of
+        self.facets = [facet for facet in CUBE_FACETS if facet in engine.codes]
+        n_ramos = len(engine.values['ramo_direito'])
+        n_areas = len(engine.values['area_estudo'])
+
+        # Ramo "slots": one per ramo code plus a last slot for the NaN-ramo link of julgados without ramo
+        link_rows = engine.link_rows
+        link_slots = engine.codes['ramo_direito'].astype(np.int64)
+        link_slots[link_slots < 0] = n_ramos
+        link_areas = engine.codes['area_estudo']
+        self.slot_area = np.full(n_ramos + 1, -1, dtype=np.int64)
+        self.slot_area[link_slots] = link_areas
+
+        # Combination of slots per julgado: rows of a padded (julgado x max links) matrix, made unique
+        order = np.lexsort((link_slots, link_rows))
+        rows_sorted, slots_sorted = link_rows[order], link_slots[order]
+        first_link = np.searchsorted(rows_sorted, rows_sorted)
+        width = int((np.arange(len(rows_sorted)) - first_link).max(initial=-1)) + 1
+        padded = np.full((engine.n_rows, max(width, 1)), -1, dtype=np.int64)
+        padded[rows_sorted, np.arange(len(rows_sorted)) - first_link] = slots_sorted
+        combos, combo_of_row, _ = _unique_rows(padded)
+        self.combo_slots = np.zeros((len(combos), n_ramos + 1), dtype=bool)
+        combo_index, position = np.nonzero(combos >= 0)
+        self.combo_slots[combo_index, combos[combo_index, position]] = True
+        self.slot_areas = np.zeros((n_ramos + 1, max(n_areas, 1)), dtype=bool)
+        has_area = self.slot_area >= 0
+        self.slot_areas[np.nonzero(has_area)[0], self.slot_area[has_area]] = True
+
+        # Cells: distinct (facet codes..., combo) keys with the number of julgados in each
+        keys = np.column_stack([engine.codes[facet] for facet in self.facets] + [combo_of_row.ravel()])
+        cell_keys, cell_of_row, cell_counts = _unique_rows(keys)
+        self.cell_keys = cell_keys.astype(np.int32)
+        self.cell_of_row = cell_of_row.ravel().astype(np.int32)
+        self.cell_counts = cell_counts.astype(np.int64)
+        self.cell_combo = self.cell_keys[:, -1]
+
+    def __len__(self):
+        return len(self.cell_counts)
+
+    def covers(self, selections):
+        # False when a selected facet is not a cube dimension; summary() then needs the filtered rows
+        return all(facet in self.facets or facet in LINK_FACETS for facet, values in selections.items() if values)
+
+    def _codes(self, facet, selected):
+        lookup = self.code_of.get(facet, {})
+        return [lookup[v] for v in selected if v in lookup]
+
+    def _allowed_slots(self, selections):
+        # Same link semantics as FilterEngine: ramos narrowed by the selected áreas, or áreas alone
+        allowed = np.ones(len(self.slot_area), dtype=bool)
+        if selections.get('ramo_direito'):
+            allowed[:] = False
+            allowed[self._codes('ramo_direito', selections['ramo_direito'])] = True
+        if selections.get('area_estudo'):
+            allowed &= np.isin(self.slot_area, self._codes('area_estudo', selections['area_estudo']))
+        return allowed
+
+    def _cell_weights(self, selections, allowed):
+        mask = np.ones(len(self.cell_counts), dtype=bool)
+        for dim, facet in enumerate(self.facets):
+            if selections.get(facet):
+                mask &= np.isin(self.cell_keys[:, dim], self._codes(facet, selections[facet]))
+        if any(selections.get(facet) for facet in LINK_FACETS):
+            mask &= self.combo_slots[:, allowed].any(axis=1)[self.cell_combo]
+        return np.where(mask, self.cell_counts, 0)
+
+    def summary(self, selections, rows=None):
+        # Unique-julgado counts per facet value for a sidebar selection.
+        # `rows` (already filtered, e.g. favorites) replaces the cell mask with a bincount over those rows.
+        allowed = self._allowed_slots(selections)
+        if rows is None:
+            weights = self._cell_weights(selections, allowed)
+        else:
+            weights = np.bincount(self.cell_of_row[rows], minlength=len(self.cell_counts))
+        summary = {'total': int(weights.sum())}
+        for dim, facet in enumerate(self.facets):
+            keys = self.cell_keys[:, dim]
+            valid = keys >= 0
+            bins = np.bincount(keys[valid], weights=weights[valid], minlength=len(self.values[facet]))
+            summary[facet] = dict(zip(self.values[facet], bins.astype(np.int64).tolist()))
+
+        combo_totals = np.bincount(self.cell_combo, weights=weights, minlength=len(self.combo_slots))
+        matched = self.combo_slots & allowed
+        ramo_bins = combo_totals @ matched
+        area_bins = combo_totals @ ((matched.astype(np.int64) @ self.slot_areas) > 0)
+        summary['ramo_direito'] = dict(zip(self.values['ramo_direito'], ramo_bins[:-1].astype(np.int64).tolist()))
+        summary['area_estudo'] = dict(zip(self.values['area_estudo'], area_bins.astype(np.int64).tolist()))
+        summary['links'] = int(ramo_bins.sum())
+        return summary
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Flat modules at the repo root
+
+from benchmark import generate_corpus
+
+N_JULGADOS = 300
+
+
+@pytest.fixture
+def corpus():
+    # Same synthetic generator as benchmark.py, small enough for the related index to build in about a second
+    return generate_corpus(N_JULGADOS, seed=7)
+
+
+@pytest.fixture
+def batch(corpus):
+    # A weekly batch without an 'id' column: two updated julgados (same informativo + título) and three new ones
+    updated = corpus.iloc[[10, 150]].copy()
+    updated['Tese Julgado'] = ["tese revista usucapião especial urbana", "tese revista imposto sobre grandes fortunas"]
+    new = corpus.iloc[[20, 21, 22]].copy()
+    new['Numero do informativo'] = 2000
+    new['Título'] = ["quilombola território titulação", "marco temporal terras indígenas", "piso salarial enfermagem"]
+    return pd.concat([updated, new], ignore_index=True)
+
+
+@pytest.fixture
+def workspace(tmp_path, corpus, batch):
+    # -> (spreadsheet path, batch path, snapshot dir)
+    excel_path = tmp_path / "Dados_InformativosSTF.parquet"
+    corpus.to_parquet(excel_path, index=False)
+    batch_path = tmp_path / "lote.csv"
+    batch.to_csv(batch_path, index=False)
+    return str(excel_path), str(batch_path), str(tmp_path / "cache")
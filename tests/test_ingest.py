@@ -0,0 +1,155 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import ingest
+import related
+import search_index
+
+QUERIES = ['usucapião', 'imposto', 'quilombola', 'constitu*', 'tributari*', '"repercussão geral"', '"marco temporal"',
+           'servidor aposentadoria', 'prisao preventiva']
+
+
+def _ingested(workspace):
+    excel_path, batch_path, snapshot_dir = workspace
+    ingest.ingest(excel_path, [], snapshot_dir)
+    previous, _ = data_store.load_snapshot(excel_path, snapshot_dir)
+    ingest.ingest(excel_path, [batch_path], snapshot_dir)
+    dataset, manifest = data_store.load_snapshot(excel_path, snapshot_dir)
+    return previous, dataset, manifest
+
+
+def _by_key(julgados):
+    return julgados.assign(numero_informativo=julgados['numero_informativo'].astype(str)).set_index(['numero_informativo', 'Título'])
+
+
+# --- Merge do lote ---
+def test_batch_upserts_by_informativo_and_titulo(workspace, batch):
+    previous, dataset, manifest = _ingested(workspace)
+    assert manifest['previous_version'] == previous.version
+    assert len(dataset) == len(previous) + 3
+    # Updated julgados keep their row code and id; new ones are appended
+    for row in (10, 150):
+        assert dataset.julgados['id'].iloc[row] == previous.julgados['id'].iloc[row]
+        assert dataset.julgados['tese_julgamento'].iloc[row].startswith("tese revista")
+    assert list(dataset.julgados['numero_informativo'].astype(str).iloc[-3:]) == ['2000'] * 3
+    assert dataset.julgados['id'].is_unique
+    unchanged = np.setdiff1d(np.arange(len(previous)), [10, 150])
+    pd.testing.assert_frame_equal(dataset.julgados.iloc[unchanged].astype(object).reset_index(drop=True),
+                                  previous.julgados.iloc[unchanged].astype(object).reset_index(drop=True))
+
+
+def test_same_batch_is_ingested_once(workspace):
+    excel_path, batch_path, snapshot_dir = workspace
+    _, dataset, manifest = _ingested(workspace)
+    again, again_manifest, changed_rows = data_store.ingest_batch(excel_path, batch_path, snapshot_dir)
+    assert not len(changed_rows)
+    assert again_manifest['version'] == manifest['version']
+    assert len(again) == len(dataset)
+
+
+def test_new_version_is_visible_only_with_its_indexes(workspace, monkeypatch):
+    excel_path, batch_path, snapshot_dir = workspace
+    ingest.prepare(excel_path, snapshot_dir)
+    previous, _ = data_store.load_snapshot(excel_path, snapshot_dir)
+    seen = []
+
+    def build_indexes(dataset, changed_rows=None, previous=None):
+        seen.append(data_store.snapshot_is_fresh(excel_path, snapshot_dir)['version']) # What a running app would load now
+        build(dataset, changed_rows, previous)
+
+    build = ingest.build_indexes
+    monkeypatch.setattr(ingest, 'build_indexes', build_indexes)
+    ingest.ingest(excel_path, [batch_path], snapshot_dir)
+    dataset, _ = data_store.load_snapshot(excel_path, snapshot_dir)
+    assert seen[0] == previous.version != dataset.version
+    assert search_index.SearchIndex.load(dataset.paths['search'], dataset.version) is not None
+    assert related.load_saved(dataset.version, dataset.paths['related']) is not None
+
+
+# --- Índices incrementais x reconstrução completa ---
+def test_incremental_search_index_matches_full_build(workspace):
+    _, dataset, _ = _ingested(workspace)
+    incremental = search_index.SearchIndex.load(dataset.paths['search'], dataset.version)
+    assert incremental is not None # Written by ingest.py from the previous version's index
+    full = search_index.SearchIndex.build(dataset.julgados, dataset.version)
+
+    np.testing.assert_array_equal(incremental.doc_len, full.doc_len)
+    # The incremental vocab may keep terms whose only documents were replaced; those have no postings
+    for term in set(incremental.vocab) - set(full.vocab):
+        assert incremental._postings(term).stop == incremental._postings(term).start
+    for term in full.vocab:
+        a, b = incremental._postings(term), full._postings(term)
+        np.testing.assert_array_equal(incremental.post_docs[a], full.post_docs[b])
+        np.testing.assert_array_equal(incremental.post_tf[a], full.post_tf[b])
+    for query in QUERIES:
+        rows, scores = incremental.search(query)
+        expected_rows, expected_scores = full.search(query)
+        np.testing.assert_array_equal(np.sort(rows), np.sort(expected_rows), err_msg=query)
+        np.testing.assert_allclose(np.sort(scores), np.sort(expected_scores), rtol=1e-6, err_msg=query)
+
+
+def test_incremental_related_matches_full_build(workspace):
+    previous, dataset, _ = _ingested(workspace)
+    assert related.load_saved(dataset.version, dataset.paths['related']).counts is None # The app never loads the counts
+    incremental = related.RelatedIndex.load(dataset.paths['related'], dataset.version)
+    assert incremental is not None
+    full = related.RelatedIndex.build(dataset.julgados, dataset.version)
+
+    assert (incremental.counts != full.counts).nnz == 0
+    # Changed julgados (and julgados that pointed at them) get exact lists; the others keep the previous idf,
+    # so only the changed julgados are compared with the full build
+    changed = np.array([10, 150, len(previous), len(previous) + 1, len(previous) + 2])
+    np.testing.assert_allclose(incremental.scores[changed], full.scores[changed], atol=1e-5)
+    np.testing.assert_array_equal(incremental.neighbours[changed], full.neighbours[changed])
+    # Everyone else still lists valid, distinct neighbours, never itself
+    for row in range(len(dataset)):
+        neighbours = [r for r, _ in incremental.related(row)]
+        assert row not in neighbours
+        assert len(set(neighbours)) == len(neighbours)
+        assert all(0 <= r < len(dataset) for r in neighbours)
+
+
+# --- Reaplicação dos lotes quando a planilha é substituída ---
+def test_batches_are_replayed_on_a_replaced_spreadsheet(workspace, corpus):
+    excel_path, _, snapshot_dir = workspace
+    _, ingested, _ = _ingested(workspace)
+
+    replaced = corpus.copy()
+    replaced.loc[5, 'Resumo'] = "resumo corrigido na planilha nova"
+    replaced.loc[10, 'Tese Julgado'] = "tese da planilha nova" # The batch still overrides this julgado
+    replaced = pd.concat([replaced, corpus.iloc[[30]].assign(**{'Título': "julgado novo na planilha"})], ignore_index=True)
+    replaced = replaced.iloc[::-1].reset_index(drop=True) # Row order changes too
+    replaced.to_parquet(excel_path, index=False)
+
+    dataset, manifest = data_store.load_snapshot(excel_path, snapshot_dir)
+    assert [b['file'] for b in manifest['batches']] == ['0001_lote.csv']
+    assert all(os.path.exists(path) for path in ingested.paths.values()) # Still in use by running processes
+    assert len(dataset) == len(ingested) + 1
+
+    before, after = _by_key(ingested.julgados), _by_key(dataset.julgados)
+    assert after.loc[before.index, 'id'].tolist() == before['id'].tolist() # Ids survive the reordering
+    titulo_5, titulo_10 = corpus.loc[5, 'Título'], corpus.loc[10, 'Título']
+    numero_5, numero_10 = str(corpus.loc[5, 'Numero do informativo']), str(corpus.loc[10, 'Numero do informativo'])
+    assert after.loc[(numero_5, titulo_5), 'Resumo'] == "resumo corrigido na planilha nova"
+    assert after.loc[(numero_10, titulo_10), 'tese_julgamento'] == before.loc[(numero_10, titulo_10), 'tese_julgamento']
+    assert after.loc[('2000', "piso salarial enfermagem"), 'id'] == before.loc[('2000', "piso salarial enfermagem"), 'id']
+
+    # Ramo links follow the julgados to their new row codes
+    for snapshot in (ingested, dataset):
+        assert set(snapshot.ramos['row']) == set(range(len(snapshot)))
+    ramos_before = dict(zip(ingested.julgados['id'], map(sorted, ingested.ramos_by_row)))
+    for julgado_id, ramos in zip(dataset.julgados['id'], dataset.ramos_by_row):
+        if julgado_id in ramos_before:
+            assert sorted(ramos) == ramos_before[julgado_id]
+
+
+def test_replay_gives_the_ingested_snapshot(workspace):
+    excel_path, _, snapshot_dir = workspace
+    _, ingested, manifest = _ingested(workspace)
+    rebuilt, rebuilt_manifest = data_store.build_snapshot(excel_path, snapshot_dir)
+    assert rebuilt_manifest['version'] == manifest['version']
+    pd.testing.assert_frame_equal(rebuilt.julgados, ingested.julgados, check_categorical=False)
+    pd.testing.assert_frame_equal(rebuilt.ramos, ingested.ramos, check_categorical=False)
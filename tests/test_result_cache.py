@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from result_cache import ResultCache, canonical_key
+
+N_SESSIONS = 50
+
+
+def _burst(cache, compute, key=('filtros', canonical_key({'classe_processo': ['ADI']}))):
+    # N_SESSIONS sessions asking for the same selection at the same moment
+    start = threading.Barrier(N_SESSIONS)
+
+    def session(_):
+        start.wait()
+        try:
+            return cache.get_or_compute(key, 'v1', compute)
+        except RuntimeError as e:
+            return e
+
+    with ThreadPoolExecutor(N_SESSIONS) as pool:
+        return list(pool.map(session, range(N_SESSIONS)))
+
+
+def test_same_key_is_computed_once_for_a_burst():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2) # Long enough for every session to miss
+        return {'rows': np.arange(10, dtype=np.int32)}
+
+    results = _burst(cache, compute)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()
+    assert stats['coalesced'] + stats['hits'] == N_SESSIONS - 1
+    assert stats['entries'] == 1
+    assert not cache._inflight
+
+
+def test_a_failed_computation_is_retried_by_a_waiting_session():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise RuntimeError("sessão interrompida")
+        return {'rows': np.arange(3, dtype=np.int32)}
+
+    results = _burst(cache, compute)
+    errors = [r for r in results if isinstance(r, RuntimeError)]
+    assert len(errors) == 1 # Only the session whose computation failed sees the error
+    assert len(calls) == 2
+    assert all(r['rows'].tolist() == [0, 1, 2] for r in results if not isinstance(r, RuntimeError))
+    assert not cache._inflight
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    cache = ResultCache()
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return {'rows': np.arange(1)}
+
+    with ThreadPoolExecutor(2) as pool:
+        pending = pool.submit(cache.get_or_compute, 'a', 'v1', slow)
+        time.sleep(0.05)
+        assert cache.get_or_compute('b', 'v1', lambda: {'rows': np.arange(2)})['rows'].tolist() == [0, 1]
+        release.set()
+        assert pending.result(5)['rows'].tolist() == [0]
+
+
+def test_cached_arrays_are_read_only():
+    cache = ResultCache()
+    value = cache.get_or_compute('k', 'v1', lambda: {'rows': np.arange(5)})
+    with pytest.raises(ValueError):
+        value['rows'][0] = 1
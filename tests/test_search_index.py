@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from search_index import SearchIndex, parse_query, stem, tokenize
+
+DOCS = [
+    ("Repercussão geral reconhecida", "Tema de repercussão geral sobre contribuições previdenciárias.", "Plenário."),
+    ("Execução fiscal", "A decisão tributária não pode ser revista para aumentar o tributo.", "Decisões tributárias."),
+    ("Habeas corpus coletivo", "Cabe habeas corpus para gestantes presas preventivamente.", "Art. 5º, LXVIII (CF)."),
+    ("Corpus habeas invertido", "Texto com as palavras em outra ordem: corpus e habeas.", "Controle."),
+    ("Servidor público", "Aposentadoria especial de servidores públicos.", "Para o STF, é devida."),
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    julgados = pd.DataFrame(DOCS, columns=['Título', 'tese_julgamento', 'Resumo'])
+    return SearchIndex.build(julgados, 'teste')
+
+
+def _rows(index, query):
+    return sorted(index.search(query)[0].tolist())
+
+
+def test_accents_and_case_are_folded(index):
+    assert parse_query("Repercussão") == parse_query("repercussao") == [('term', stem('repercussao'))]
+    assert _rows(index, "REPERCUSSAO GERAL") == _rows(index, "repercussão geral") == [0]
+    assert _rows(index, "tributaria") == _rows(index, "tributárias") == [1]
+
+
+def test_prefix_of_a_stemmed_word(index):
+    # The vocabulary holds stems ("repercuss", "tributar"); a prefix longer than the stem must still match
+    assert _rows(index, "repercussao*") == [0]
+    assert _rows(index, "repercussão*") == [0]
+    assert _rows(index, "tributaria*") == [1]
+    assert _rows(index, "decisoes*") == [1]
+    assert _rows(index, "trib*") == [1]
+    assert _rows(index, "inexistente*") == []
+
+
+def test_phrase_needs_adjacent_terms_in_order(index):
+    assert parse_query('"habeas corpus"') == [('phrase', tokenize("habeas corpus"))]
+    assert _rows(index, '"habeas corpus"') == [2]
+    assert _rows(index, 'habeas corpus') == [2, 3]
+    assert _rows(index, '"corpus habeas"') == [3]
+
+
+def test_stopwords_are_checked_before_stemming(index):
+    # "para" stems to "par"; it is still a stopword and must not narrow the query
+    assert parse_query("servidor para") == [('term', stem('servidor'))]
+    assert parse_query("sobre aposentadoria") == [('term', stem('aposentadoria'))]
+    assert _rows(index, "para servidor") == [4]
+
+
+def test_stopword_only_query_is_kept(index):
+    # With nothing else to search for, the stopwords themselves are the query
+    assert parse_query("para") == [('term', stem('para'))]
+    assert _rows(index, "para") == [1, 2, 4]
+    assert parse_query("") == []
+    assert len(index.search("")[0]) == 0
+
+
+def test_metacharacters_are_plain_text(index):
+    assert parse_query("art. 5º (CF)") == [('term', 'art'), ('term', '5o'), ('term', 'cf')]
+    assert _rows(index, "art. 5º (CF)") == [2]
+    for query in ("[a-z]+", "(.*)", "\\d+", "a|b", "?", "*"):
+        rows, scores = index.search(query) # Must not raise; nothing is interpreted as a pattern
+        assert len(rows) == len(scores)
+    assert _rows(index, "(.*)") == []
+
+
+def test_results_are_ranked_and_restricted(index):
+    rows, scores = index.search("habeas")
+    assert np.all(np.diff(scores) <= 0)
+    assert _rows(index, "habeas") == [2, 3]
+    assert index.search("habeas", rows=np.array([3]))[0].tolist() == [3]
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from filter_engine import FilterEngine
+from stats_cube import StatsCube
+
+
+@pytest.fixture
+def dataset(corpus):
+    julgados, ramos = data_store.process_dataframe(corpus)
+    return data_store.Dataset(julgados, ramos, 'teste')
+
+
+def _brute_force(dataset, selections, rows=None):
+    # Straight from the tables: the julgados that match, then every facet counted over their allowed links
+    julgados, ramos = dataset.julgados, dataset.ramos.astype({'ramo_direito': object, 'area_estudo': object})
+    allowed = pd.Series(True, index=ramos.index)
+    if selections.get('ramo_direito'):
+        allowed &= ramos['ramo_direito'].isin(selections['ramo_direito'])
+    if selections.get('area_estudo'):
+        allowed &= ramos['area_estudo'].isin(selections['area_estudo'])
+    if rows is None:
+        match = pd.Series(True, index=julgados.index)
+        for facet in ('ano_julgamento', 'ano_mes_julgamento', 'classe_processo', 'repercussao_geral'):
+            if selections.get(facet):
+                match &= julgados[facet].astype(object).isin(selections[facet])
+        if selections.get('ramo_direito') or selections.get('area_estudo'):
+            match &= julgados.index.isin(ramos.loc[allowed, 'row'])
+        rows = np.flatnonzero(match.to_numpy())
+    links = ramos[allowed & ramos['row'].isin(rows)]
+    selected = julgados.iloc[rows]
+    summary = {'total': len(rows), 'links': len(links)}
+    for facet in ('ano_julgamento', 'ano_mes_julgamento', 'classe_processo', 'repercussao_geral'):
+        summary[facet] = selected[facet].astype(object).dropna().value_counts().to_dict()
+    for facet in ('ramo_direito', 'area_estudo'):
+        summary[facet] = links.dropna(subset=[facet]).drop_duplicates(['row', facet])[facet].value_counts().to_dict()
+    return summary
+
+
+def _nonzero(summary):
+    return {facet: ({value: n for value, n in counts.items() if n} if isinstance(counts, dict) else counts)
+            for facet, counts in summary.items()}
+
+
+def _selections(dataset, seed):
+    # Random sidebar state: each facet left empty or given one to three of its values
+    rng = np.random.default_rng(seed)
+    values = {
+        'ano_julgamento': dataset.julgados['ano_julgamento'].dropna().unique().tolist(),
+        'ano_mes_julgamento': dataset.julgados['ano_mes_julgamento'].dropna().unique().tolist(),
+        'classe_processo': dataset.julgados['classe_processo'].dropna().unique().tolist(),
+        'repercussao_geral': dataset.julgados['repercussao_geral'].dropna().unique().tolist(),
+        'ramo_direito': dataset.ramos['ramo_direito'].dropna().unique().tolist(),
+        'area_estudo': dataset.ramos['area_estudo'].dropna().unique().tolist(),
+    }
+    selections = {}
+    for facet, options in values.items():
+        if rng.random() < 0.4:
+            selections[facet] = rng.choice(np.array(options, dtype=object), size=min(len(options), rng.integers(1, 4)),
+                                           replace=False).tolist()
+    return selections
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_cube_matches_brute_force(dataset, seed):
+    cube = StatsCube(FilterEngine(dataset))
+    selections = _selections(dataset, seed)
+    assert cube.covers(selections)
+    assert _nonzero(cube.summary(selections)) == _brute_force(dataset, selections)
+
+
+def test_cube_ramo_and_area_together(dataset):
+    # A ramo outside the selected área contributes nothing, and an área counts a julgado once
+    cube = StatsCube(FilterEngine(dataset))
+    selections = {'ramo_direito': ['Direito Tributário', 'Direito Penal'], 'area_estudo': ['Direito Público']}
+    assert _nonzero(cube.summary(selections)) == _brute_force(dataset, selections)
+    assert _nonzero(cube.summary({'area_estudo': ['Direito Público']})) == _brute_force(dataset, {'area_estudo': ['Direito Público']})
+
+
+def test_cube_over_given_rows(dataset):
+    # Favorites: the rows are already filtered, the cube only counts them
+    cube = StatsCube(FilterEngine(dataset))
+    rows = np.sort(np.random.default_rng(3).choice(len(dataset), size=40, replace=False)).astype(np.int32)
+    for selections in ({}, {'ramo_direito': ['Direito Constitucional']}):
+        assert _nonzero(cube.summary(selections, rows)) == _brute_force(dataset, selections, rows)
@@ -0,0 +1,88 @@
+import sqlite3
+import time
+
+import pytest
+
+from user_store import UserStore, new_user_id
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "usuarios.sqlite3")
+
+
+def _store(db_path, **kwargs):
+    store = UserStore(db_path, **kwargs)
+    store._conn.execute("PRAGMA busy_timeout=50") # Fail fast on the lock instead of waiting 5s
+    return store
+
+
+def _lock(db_path):
+    # Another replica in the middle of a write transaction
+    other = sqlite3.connect(db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    return other
+
+
+def _favorites(db_path, user_id):
+    with sqlite3.connect(db_path) as conn:
+        return {r[0] for r in conn.execute("SELECT julgado_id FROM favorites WHERE user_id = ?", (user_id,))}
+
+
+def test_write_survives_a_locked_database(db_path):
+    store = _store(db_path, flush_delay=60, refresh_seconds=0)
+    user = new_user_id()
+    other = _lock(db_path)
+
+    assert store.toggle_favorite(user, '42')
+    store.flush() # "database is locked": must not raise
+    assert store.stats()['pending'] == 1
+    assert store._timer is not None # Retry armed
+    # Re-reading the user while the write is queued keeps the in-memory copy instead of the stale database
+    assert store.user(user).favorites == {'42'}
+
+    other.execute("ROLLBACK")
+    other.close()
+    store.flush()
+    assert store.stats()['pending'] == 0
+    assert _favorites(db_path, user) == {'42'}
+    assert store.user(user).favorites == {'42'}
+
+
+def test_retry_timer_writes_after_the_lock_is_released(db_path):
+    store = _store(db_path, flush_delay=0.05)
+    user = new_user_id()
+    other = _lock(db_path)
+    store.toggle_favorite(user, '7')
+    store.add_meta(user, ['7', '8'])
+    time.sleep(0.3) # The timer fires and fails at least once
+    assert store.stats()['pending'] == 3
+
+    other.execute("ROLLBACK")
+    other.close()
+    deadline = time.monotonic() + 5
+    while store.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert store.stats()['pending'] == 0
+    assert _favorites(db_path, user) == {'7'}
+    assert _store(db_path).user(user).metas[0][1] == ['7', '8']
+
+
+def test_lru_eviction_keeps_users_with_pending_writes(db_path):
+    store = _store(db_path, flush_delay=60, max_users=2)
+    writer, others = new_user_id(), [new_user_id() for _ in range(3)]
+    other = _lock(db_path)
+    store.toggle_favorite(writer, '1')
+    store.flush()
+    for user in others:
+        store.user(user)
+    # The writer is the least recently used, but its favorite is not in the database yet: the next ones go instead
+    assert list(store._users) == [writer, others[-1]]
+
+    other.execute("ROLLBACK")
+    other.close()
+    store.flush()
+    store.user(new_user_id())
+    assert writer not in store._users
+    assert len(store._users) == 2
+    assert store.user(writer).favorites == {'1'} # Re-read from the database
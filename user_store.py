@@ -0,0 +1,195 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# --- Configuração (variáveis de ambiente no deploy) ---
+# Replicas on the same host share the data by pointing INFORMATIVOS_USER_DB at the same local file
+# (SQLite WAL needs a local filesystem, not a network share).
+DB_PATH = os.environ.get('INFORMATIVOS_USER_DB', 'informativos_usuarios.sqlite3')
+FLUSH_DELAY = float(os.environ.get('INFORMATIVOS_USER_DB_FLUSH', 1.0)) # Writes wait this long to be batched in one transaction
+REFRESH_SECONDS = float(os.environ.get('INFORMATIVOS_USER_DB_REFRESH', 30)) # Re-read a user's data written by other replicas
+MAX_METAS = 20 # Meta history kept per user
+MAX_CACHED_USERS = int(os.environ.get('INFORMATIVOS_USER_CACHE', 5000)) # Users kept in memory per process (LRU); the rest are re-read on demand
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS favorites (
+    user_id TEXT NOT NULL, julgado_id TEXT NOT NULL, created_at REAL NOT NULL,
+    PRIMARY KEY (user_id, julgado_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metas (
+    user_id TEXT NOT NULL, created_at REAL NOT NULL, julgado_ids TEXT NOT NULL,
+    PRIMARY KEY (user_id, created_at)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reading_progress (
+    user_id TEXT NOT NULL, julgado_id TEXT NOT NULL, read_at REAL NOT NULL,
+    PRIMARY KEY (user_id, julgado_id)) WITHOUT ROWID;
+"""
+
+
+def parse_user_id(value):
+    # Only canonical UUIDs are accepted from the URL; anything else gets a fresh id
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def new_user_id():
+    return str(uuid.uuid4())
+
+
+class UserState:
+    # In-memory copy of one user's data; the store keeps it in sync with SQLite
+    def __init__(self, favorites, metas, read):
+        self.favorites = favorites # set of julgado ids
+        self.metas = metas # [(created_at, [julgado ids])], newest first
+        self.read = read # set of julgado ids marked as read
+        self.loaded_at = time.monotonic()
+        self.favorites_version = 0
+        self._rows = None # (data version, favorites_version, row codes)
+
+
+class UserStore:
+    def __init__(self, path=DB_PATH, flush_delay=FLUSH_DELAY, refresh_seconds=REFRESH_SECONDS, max_users=MAX_CACHED_USERS):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.refresh_seconds = refresh_seconds
+        self.max_users = max_users
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # WAL: fsync on checkpoint, not on every commit
+        self._conn.execute("PRAGMA busy_timeout=5000") # Other replicas may be writing
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock() # Streamlit runs each session on its own thread
+        self._users = OrderedDict() # user_id -> UserState, least recently used first
+        self._pending = [] # (sql, params) waiting for the next flush
+        self._timer = None
+        self.flushes = self.writes = 0
+        atexit.register(self.flush)
+
+    # --- Leitura ---
+    def _load(self, user_id):
+        rows = self._conn.execute("SELECT julgado_id FROM favorites WHERE user_id = ?", (user_id,)).fetchall()
+        favorites = {r[0] for r in rows}
+        rows = self._conn.execute("SELECT created_at, julgado_ids FROM metas WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+                                  (user_id, MAX_METAS)).fetchall()
+        metas = [(created_at, json.loads(ids)) for created_at, ids in rows]
+        rows = self._conn.execute("SELECT julgado_id FROM reading_progress WHERE user_id = ?", (user_id,)).fetchall()
+        return UserState(favorites, metas, {r[0] for r in rows})
+
+    def _pending_users(self):
+        return {params[0] for _, params in self._pending} # Every statement starts with user_id
+
+    def user(self, user_id):
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None or time.monotonic() - state.loaded_at > self.refresh_seconds:
+                self._flush_locked() # Our own pending writes must be in the database before re-reading it
+                if state is not None and user_id in self._pending_users():
+                    state.loaded_at = time.monotonic() # Flush failed: the database doesn't have them yet, keep our copy
+                else:
+                    fresh = self._load(user_id)
+                    if state is not None and fresh.favorites != state.favorites:
+                        fresh.favorites_version = state.favorites_version + 1
+                    state = self._users[user_id] = fresh
+            self._users.move_to_end(user_id)
+            if len(self._users) > self.max_users:
+                self._evict()
+            return state
+
+    def _evict(self):
+        # Least recently used first; users with unwritten changes stay until their flush succeeds
+        pending = self._pending_users()
+        for user_id in list(self._users):
+            if len(self._users) <= self.max_users:
+                break
+            if user_id not in pending:
+                del self._users[user_id]
+
+    def favorite_rows(self, user_id, dataset):
+        # Sorted row codes of the user's favorites, cached until the favorites or the data version change
+        state = self.user(user_id)
+        key = (dataset.version, state.favorites_version)
+        if state._rows is None or state._rows[0] != key:
+            state._rows = (key, dataset.rows_of_ids(state.favorites))
+        return state._rows[1]
+
+    # --- Escrita (em lote) ---
+    def _enqueue(self, sql, params):
+        self._pending.append((sql, params))
+        self._arm_timer()
+
+    def _arm_timer(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def toggle_favorite(self, user_id, julgado_id):
+        with self._lock:
+            state = self.user(user_id)
+            if julgado_id in state.favorites:
+                state.favorites.remove(julgado_id)
+                self._enqueue("DELETE FROM favorites WHERE user_id = ? AND julgado_id = ?", (user_id, julgado_id))
+            else:
+                state.favorites.add(julgado_id)
+                self._enqueue("INSERT OR REPLACE INTO favorites VALUES (?, ?, ?)", (user_id, julgado_id, time.time()))
+            state.favorites_version += 1
+            return julgado_id in state.favorites
+
+    def add_meta(self, user_id, julgado_ids):
+        with self._lock:
+            state = self.user(user_id)
+            created_at = max(time.time(), state.metas[0][0] + 1e-6 if state.metas else 0)
+            state.metas.insert(0, (created_at, list(julgado_ids)))
+            del state.metas[MAX_METAS:]
+            self._enqueue("INSERT OR REPLACE INTO metas VALUES (?, ?, ?)", (user_id, created_at, json.dumps(list(julgado_ids))))
+            self._enqueue("DELETE FROM metas WHERE user_id = ? AND created_at < ?", (user_id, state.metas[-1][0]))
+
+    def set_read(self, user_id, julgado_id, read=True):
+        with self._lock:
+            state = self.user(user_id)
+            if read:
+                state.read.add(julgado_id)
+                self._enqueue("INSERT OR REPLACE INTO reading_progress VALUES (?, ?, ?)", (user_id, julgado_id, time.time()))
+            else:
+                state.read.discard(julgado_id)
+                self._enqueue("DELETE FROM reading_progress WHERE user_id = ? AND julgado_id = ?", (user_id, julgado_id))
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        # One transaction (one WAL commit) for the whole burst of clicks
+        try:
+            self._conn.execute("BEGIN IMMEDIATE") # Raises "database is locked" while another replica writes
+            for sql, params in pending:
+                self._conn.execute(sql, params)
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self._conn.in_transaction:
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            # Never raised to the caller (a user's rerun or the timer thread): the writes go back in the queue
+            self._pending = pending + self._pending
+            self._arm_timer()
+            print(f"Aviso: falha ao gravar dados dos usuários ({e}); nova tentativa em {self.flush_delay:g}s.")
+            return
+        self.flushes += 1
+        self.writes += len(pending)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._users), 'pending': len(self._pending), 'flushes': self.flushes, 'writes': self.writes}